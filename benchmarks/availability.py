@@ -0,0 +1,159 @@
+"""Hold many availability streams open and measure how fast updates reach them.
+
+    python -m benchmarks.availability --subscribers 1000 --updates 20
+    python -m benchmarks.availability --subscribers 1000 --transport hub
+
+--transport http (the default) opens real SSE connections to a threaded local
+WSGI server, one client thread each. --transport hub skips HTTP and waits on
+the pub/sub directly. The publisher sends --updates changes --interval
+seconds apart, then a burst of --burst changes back to back. The burst
+shows coalescing: each stream should get one or two events for it, not one
+per change. Latency runs from publish to the moment a client has parsed
+the event.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from website import create_app, db
+from website.availability import get_hub, publish_availability
+from website.migrations import upgrade
+from website.models import Event, User
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _http_subscriber(port, event_id, stop, received, ready):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request("GET", f"/events/{event_id}/availability")
+    response = conn.getresponse()
+    first = True
+    try:
+        while not stop.is_set():
+            line = response.fp.readline()
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                data = json.loads(line[6:])
+                if first:
+                    first = False
+                    ready.release()
+                    continue
+                received.append((time.time() - data["at"]) * 1000)
+    except (OSError, ValueError):
+        pass
+    finally:
+        conn.close()
+
+
+def _hub_subscriber(app, event_id, stop, received, ready):
+    with app.app_context():
+        subscription = get_hub().subscribe(event_id)
+    ready.release()
+    try:
+        while not stop.is_set():
+            state = subscription.next(0.5)
+            if state is not None:
+                received.append((time.time() - state["at"]) * 1000)
+    finally:
+        subscription.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--transport", choices=("http", "hub"), default="http")
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between spaced-out updates")
+    parser.add_argument("--burst", type=int, default=100, help="back-to-back updates at the end")
+    parser.add_argument("--coalesce-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    # many mostly idle threads: keep their stacks small
+    threading.stack_size(256 * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            "TESTING": True,
+            "SLOW_LOG_PATH": None,
+            "AVAILABILITY_COALESCE_MS": args.coalesce_ms,
+            "AVAILABILITY_STREAM_SECONDS": 3600,
+            "DB_POOL_SIZE": 50,
+        })
+        with app.app_context():
+            upgrade()
+            user = User(first_name="Bench", last_name="Mark", email="bench@example.com", password_hash="x")
+            event = Event(
+                title="On sale", genre="Rock", venue="Hall", date=date(2030, 1, 1), start_time=dtime(20),
+                door_time=dtime(19), quantity=1_000_000, price=10, creator=user,
+            )
+            db.session.add(event)
+            db.session.commit()
+            event_id = event.id
+
+        server = None
+        if args.transport == "http":
+            server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+            server.request_queue_size = args.subscribers
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        stop, ready = threading.Event(), threading.Semaphore(0)
+        received = []  # latency in ms of every delivered event, across all subscribers
+        threads = []
+        started = time.perf_counter()
+        for _ in range(args.subscribers):
+            if server:
+                target, call = _http_subscriber, (server.server_port, event_id, stop, received, ready)
+            else:
+                target, call = _hub_subscriber, (app, event_id, stop, received, ready)
+            t = threading.Thread(target=target, args=call, daemon=True)
+            t.start()
+            threads.append(t)
+        for _ in range(args.subscribers):
+            ready.acquire()
+        print(f"{args.subscribers} {args.transport} subscribers connected in {time.perf_counter() - started:.1f}s")
+
+        quantity = 1_000_000
+        with app.app_context():
+            time.sleep(args.coalesce_ms / 1000)
+            for _ in range(args.updates):
+                quantity -= 1
+                publish_availability(event_id, quantity, "Open")
+                time.sleep(args.interval)
+            spaced = len(received)
+            for _ in range(args.burst):
+                quantity -= 1
+                publish_availability(event_id, quantity, "Open")
+            time.sleep(args.coalesce_ms / 1000 * 2 + 0.5)
+        burst = len(received) - spaced
+
+        stop.set()
+        if server:
+            server.shutdown()
+
+    ordered = sorted(received[:spaced])
+    print(f"spaced updates: {args.updates} published, {spaced} delivered "
+          f"({spaced / max(args.subscribers * args.updates, 1):.1%} of subscribers x updates)")
+    if ordered:
+        print(f"  latency ms  p50 {_percentile(ordered, 50):.1f}  p95 {_percentile(ordered, 95):.1f}  "
+              f"p99 {_percentile(ordered, 99):.1f}  max {ordered[-1]:.1f}  mean {statistics.fmean(ordered):.1f}")
+    print(f"burst: {args.burst} published back to back, {burst / args.subscribers:.1f} events per subscriber")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cancel an event with live holds and many orders; time the refunds and check nothing goes back on sale.
+
+    python -m benchmarks.cancellation --orders 50000 --batch 1000
+
+Places two holds and --orders orders on one event, then cancels it the way
+the cancel route does. One hold is confirmed after the cancel and must be
+refused and released. The other is left to lapse and be swept. The event's
+remaining quantity must not change either way. Then every order is refunded
+with refund_event_orders(), which reports the time for each batch. Exits
+non-zero if any check fails.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from sqlalchemy import insert, update
+
+from website import create_app, db
+from website.holds import confirm_hold, place_hold, sweep_expired_holds
+from website.migrations import upgrade
+from website.models import Event, Order, TicketHold, User
+from website.notifications import queue_cancellation_notices
+from website.refunds import queue_refunds, refund_event_orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--batch", type=int, default=1000, help="orders refunded per transaction")
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(ok, message):
+        print(f"[{'ok' if ok else 'FAIL'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            "TESTING": True,
+            "SLOW_LOG_PATH": None,
+        })
+        with app.app_context(), app.test_request_context():
+            upgrade()
+            user = User(first_name="Bench", last_name="Mark", email="bench@example.com", password_hash="x")
+            event = Event(
+                title="Called off", genre="Rock", venue="Hall", date=date(2030, 1, 1), start_time=dtime(20),
+                door_time=dtime(19), quantity=args.orders + 10, price=10, creator=user,
+            )
+            db.session.add(event)
+            db.session.commit()
+            event_id, user_id = event.id, user.id
+
+            confirmed = place_hold(event_id, user_id, 2).hold.token
+            lapsed = place_hold(event_id, user_id, 3).hold.token
+            placed = datetime.now()
+            for start in range(0, args.orders, 10_000):
+                db.session.execute(insert(Order), [
+                    {"user_id": user_id, "event_id": event_id, "quantity": 1, "total_price": 10, "order_date": placed}
+                    for _ in range(start, min(start + 10_000, args.orders))
+                ])
+            db.session.commit()
+
+            # as the cancel route does
+            db.session.get(Event, event_id).cancel()
+            queue_refunds(event_id)
+            queue_cancellation_notices(event_id)
+            db.session.commit()
+            remaining = db.session.scalar(db.select(Event.quantity).where(Event.id == event_id))
+
+            check(confirm_hold(confirmed, user_id) is None, "confirming a hold on a cancelled event is refused")
+            status = db.session.scalar(db.select(TicketHold.status).where(TicketHold.token == confirmed))
+            check(status == "Released", f"the refused hold is released (status {status})")
+
+            db.session.execute(
+                update(TicketHold.__table__)
+                .where(TicketHold.token == lapsed)
+                .values(expires_at=datetime.now() - timedelta(minutes=1))
+            )
+            db.session.commit()
+            check(sweep_expired_holds() == 1, "the lapsed hold is swept")
+            after = db.session.scalar(db.select(Event.quantity).where(Event.id == event_id))
+            check(after == remaining, f"no tickets returned to the cancelled event ({remaining} -> {after})")
+
+            def report(rows, batch_ms, total):
+                print(f"  {rows:,} orders in {batch_ms:.1f} ms ({total:,} so far)")
+
+            started = time.perf_counter()
+            state = refund_event_orders(event_id, args.batch, progress=report)
+            elapsed = time.perf_counter() - started
+            paid = db.session.scalar(
+                db.select(db.func.count()).select_from(Order)
+                .where(Order.event_id == event_id, Order.status == "Paid")
+            )
+            check(paid == 0 and state.rows_touched == args.orders, f"{state.rows_touched:,} orders refunded, {paid} left Paid")
+            print(f"refunds: {args.orders / elapsed:,.0f} orders/s")
+            db.session.remove()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Seeded synthetic data: users, events, comments and orders at a chosen scale.
+
+    python -m benchmarks.datagen --scale medium --database sqlite:////tmp/eventfinder-bench.sqlite
+
+The same --seed always produces the same rows, so runs on different commits
+are comparable. Every user's password is BENCH_PASSWORD.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from flask_bcrypt import generate_password_hash
+from sqlalchemy import insert
+
+from website import create_app, db
+from website.models import Comment, Event, Order, User
+
+BENCH_PASSWORD = "Bench!mark1"
+
+SCALES = {
+    # users, events, comments, orders
+    "tiny": (20, 200, 500, 500),
+    "small": (200, 2_000, 10_000, 10_000),
+    "medium": (2_000, 20_000, 100_000, 100_000),
+    "large": (20_000, 200_000, 1_000_000, 1_000_000),
+}
+
+GENRES = ["Rock", "Jazz", "Pop", "Hip Hop", "Electronic", "Classical"]
+WORDS = (
+    "rock jazz pop indie night live tour festival acoustic orchestra "
+    "summer winter soul blues electric session garden arena hall club"
+).split()
+
+
+def _batches(count: int, size: int):
+    for offset in range(0, count, size):
+        yield range(offset, min(offset + size, count))
+
+
+def seed(scale: str = "small", seed_value: int = 42, batch: int = 10_000, log=print) -> dict:
+    """Fill the current app's (empty, migrated) database. Returns the row counts."""
+    from website.analytics import rollup_sales
+    from website.counters import reconcile_counters
+    from website.maintenance import refresh_event_statuses
+    from website.search import rebuild_index
+
+    n_users, n_events, n_comments, n_orders = SCALES[scale]
+    rng = random.Random(seed_value)
+    today = date.today()
+    now = datetime.now()
+    started = time.perf_counter()
+
+    # one real hash shared by every user: hashing a million passwords would dominate seeding
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    if isinstance(password_hash, bytes):
+        password_hash = password_hash.decode()
+    for ids in _batches(n_users, batch):
+        db.session.execute(insert(User), [
+            {
+                "first_name": f"User{i}", "last_name": "Bench", "email": f"user{i}@bench.example.com",
+                "contact_number": "0400000000", "street_address": f"{i} Bench St",
+                "password_hash": password_hash,
+            }
+            for i in ids
+        ])
+    db.session.commit()
+    log(f"users    {n_users:>9,}")
+
+    prices = []
+    for ids in _batches(n_events, batch):
+        rows = []
+        for _ in ids:
+            price = float(rng.choice([0, 15, 25, 40, 60, 90, 150]))
+            prices.append(price)
+            rows.append({
+                "title": " ".join(rng.sample(WORDS, 3)).title(),
+                "genre": rng.choice(GENRES),
+                "venue": f"{rng.choice(WORDS).title()} Hall",
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                # mostly upcoming, some past, so every listing filter has rows
+                "date": today + timedelta(days=rng.randint(-60, 300)),
+                "start_time": dtime(20), "door_time": dtime(19),
+                "quantity": 1_000_000, "price": price, "status": "Open",
+                "featuredevent": rng.random() < 0.01,
+                "image": "/static/image/default_event.jpg",
+                "creator_id": rng.randint(1, n_users),
+            })
+        db.session.execute(insert(Event), rows)
+    db.session.commit()
+    log(f"events   {n_events:>9,}")
+
+    for ids in _batches(n_comments, batch):
+        db.session.execute(insert(Comment), [
+            {
+                "text": " ".join(rng.choices(WORDS, k=8)),
+                "created_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                "user_id": rng.randint(1, n_users),
+                "event_id": rng.randint(1, n_events),
+            }
+            for _ in ids
+        ])
+    db.session.commit()
+    log(f"comments {n_comments:>9,}")
+
+    for ids in _batches(n_orders, batch):
+        rows = []
+        for _ in ids:
+            event_id = rng.randint(1, n_events)
+            quantity = rng.randint(1, 4)
+            rows.append({
+                "event_id": event_id, "user_id": rng.randint(1, n_users), "quantity": quantity,
+                "total_price": prices[event_id - 1] * quantity,
+                "order_date": now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+            })
+        db.session.execute(insert(Order), rows)
+    db.session.commit()
+    log(f"orders   {n_orders:>9,}")
+
+    # derived data the app normally maintains as it goes
+    refresh_event_statuses(full=True)
+    reconcile_counters()
+    rollup_sales(settle_seconds=0)  # everything is committed
+    rebuild_index()
+    log(f"seeded in {time.perf_counter() - started:.1f}s")
+    return {"users": n_users, "events": n_events, "comments": n_comments, "orders": n_orders}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of an empty database")
+    args = parser.parse_args()
+
+    from website.migrations import upgrade
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database, "TESTING": True})
+    with app.app_context():
+        upgrade()
+        if db.session.scalar(db.select(db.func.count(User.id))):
+            parser.error("the database already has users; point --database at an empty one")
+        seed(args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
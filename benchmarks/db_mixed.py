@@ -0,0 +1,140 @@
+"""Mixed read/write load: home page reads while other threads buy tickets.
+
+    python -m benchmarks.db_mixed --readers 8 --writers 4 --seconds 10
+
+Runs the same workload once per database profile (the old rollback-journal
+defaults, then WAL with the tuned pragmas) on throwaway SQLite files and
+prints read and purchase throughput for each. The fragment cache is off so
+every read reaches the database.
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime, timedelta
+
+from sqlalchemy import insert
+
+from website import create_app, db
+from website.database import describe
+from website.migrations import upgrade
+from website.models import Event, User
+from website.reservations import purchase_tickets
+
+PROFILES = {
+    "rollback journal (old defaults)": {
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_CACHE_SIZE_KB": 2000,
+        "SQLITE_MMAP_SIZE": 0,
+    },
+    "wal + tuned pragmas": {},
+}
+
+
+def _seed(events: int, tickets: int):
+    user = User(first_name="Bench", last_name="Mark", email="bench@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    start = date.today() + timedelta(days=1)
+    db.session.execute(insert(Event), [
+        {
+            "title": f"Show {i}", "genre": "Rock", "venue": "Hall", "description": "live",
+            "date": start + timedelta(days=i % 60), "start_time": dtime(20), "door_time": dtime(19),
+            "quantity": tickets, "price": 25.0, "status": "Open", "creator_id": user.id,
+        }
+        for i in range(events)
+    ])
+    db.session.commit()
+    return user.id
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    return statistics.quantiles(samples, n=100)[pct - 1] if len(samples) > 1 else samples[0]
+
+
+def _run(app, user_id, events, readers, writers, seconds):
+    stop = time.perf_counter() + seconds
+    reads, writes, failures = [], [], []
+    lock = threading.Lock()
+
+    def reader():
+        client = app.test_client()
+        local = []
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            response = client.get("/")
+            local.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                failures.append(response.status_code)
+        with lock:
+            reads.extend(local)
+
+    def writer(seed):
+        local = []
+        with app.app_context():
+            n = seed
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                try:
+                    purchase_tickets(n % events + 1, user_id, 1)
+                except Exception as exc:  # lock errors that outlived the retries
+                    db.session.rollback()
+                    failures.append(type(exc).__name__)
+                local.append((time.perf_counter() - started) * 1000)
+                n += writers
+        with lock:
+            writes.extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return reads, writes, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--events", type=int, default=500)
+    args = parser.parse_args()
+
+    for name, overrides in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bench.sqlite",
+                "TESTING": True,
+                "CACHE_BACKEND": "none",
+                "SLOW_LOG_PATH": None,
+                **overrides,
+            })
+            with app.app_context():
+                upgrade()
+                user_id = _seed(args.events, tickets=1_000_000)
+                settings = describe(db.engine)
+
+            reads, writes, failures = _run(app, user_id, args.events, args.readers, args.writers, args.seconds)
+
+            print(f"== {name}: journal_mode={settings['journal_mode']} synchronous={settings['synchronous']}")
+            print(
+                f"   reads  {len(reads) / args.seconds:8.1f}/s  "
+                f"p50 {_percentile(reads, 50):7.1f} ms  p95 {_percentile(reads, 95):7.1f} ms"
+            )
+            print(
+                f"   buys   {len(writes) / args.seconds:8.1f}/s  "
+                f"p50 {_percentile(writes, 50):7.1f} ms  p95 {_percentile(writes, 95):7.1f} ms"
+            )
+            print(f"   failures {len(failures)}")
+            with app.app_context():
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
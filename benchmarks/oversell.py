@@ -0,0 +1,110 @@
+"""Many threads race to buy the last tickets of one event; fail if any are oversold.
+
+    python -m benchmarks.oversell --threads 32 --tickets 100 --rounds 5
+
+Each round puts --tickets tickets on a fresh event and starts --threads
+buyers together. Each buyer keeps calling purchase_tickets() for
+--per-order tickets until the event is sold out. Every purchase goes
+through the conditional UPDATE in reservations.take_tickets(). Checks after
+each round:
+  - the event's quantity is not negative;
+  - tickets_sold plus the remaining quantity equals what went on sale;
+  - the orders add up to tickets_sold.
+Reports successful purchases per second and exits non-zero on any oversell.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime
+
+from website import create_app, db
+from website.migrations import upgrade
+from website.models import Event, Order, User
+from website.reservations import purchase_tickets
+
+
+def _buyer(app, event_id, user_id, per_order, start, outcomes):
+    with app.app_context():
+        start.wait()
+        while True:
+            result = purchase_tickets(event_id, user_id, per_order)
+            outcomes.append(result.status)
+            if result.status in ("sold_out", "closed", "not_found"):
+                break
+            if result.status == "insufficient":
+                # fewer than per_order left: take what remains one at a time
+                per_order = 1
+        db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--tickets", type=int, default=100, help="tickets on sale each round")
+    parser.add_argument("--per-order", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    oversold = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            "TESTING": True,
+            "SLOW_LOG_PATH": None,
+            "DB_POOL_SIZE": args.threads,
+            "RESERVATION_MAX_RETRIES": 50,
+        })
+        with app.app_context():
+            upgrade()
+            user = User(first_name="Bench", last_name="Mark", email="bench@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        print(f"{'round':>5}{'sold':>7}{'left':>6}{'orders':>8}{'misses':>8}{'purchases/s':>13}")
+        for n in range(1, args.rounds + 1):
+            with app.app_context():
+                event = Event(
+                    title=f"Last tickets {n}", genre="Rock", venue="Hall", date=date(2030, 1, 1),
+                    start_time=dtime(20), door_time=dtime(19), quantity=args.tickets, price=10, creator_id=user_id,
+                )
+                db.session.add(event)
+                db.session.commit()
+                event_id = event.id
+
+            start, outcomes = threading.Event(), []
+            buyers = [
+                threading.Thread(target=_buyer, args=(app, event_id, user_id, args.per_order, start, outcomes))
+                for _ in range(args.threads)
+            ]
+            for t in buyers:
+                t.start()
+            began = time.perf_counter()
+            start.set()
+            for t in buyers:
+                t.join()
+            elapsed = time.perf_counter() - began
+
+            with app.app_context():
+                left, sold = db.session.execute(
+                    db.select(Event.quantity, Event.tickets_sold).where(Event.id == event_id)
+                ).one()
+                ordered = db.session.scalar(
+                    db.select(db.func.coalesce(db.func.sum(Order.quantity), 0)).where(Order.event_id == event_id)
+                )
+                db.session.remove()
+            purchases = outcomes.count("ok")
+            print(f"{n:>5}{sold:>7}{left:>6}{ordered:>8}{len(outcomes) - purchases:>8}{purchases / elapsed:>13.1f}")
+            if left < 0 or sold > args.tickets or sold + left != args.tickets or ordered != sold:
+                oversold += 1
+                print(f"  OVERSOLD: {args.tickets} on sale, {sold} sold, {left} left, {ordered} in orders")
+
+    print("no oversell" if not oversold else f"oversell in {oversold} of {args.rounds} rounds")
+    sys.exit(1 if oversold else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Logins per second at each bcrypt cost, per core and through the app's hashing pool.
+
+    python -m benchmarks.passwords --costs 10,11,12,13 --logins 40 --threads 16
+
+Per core: one thread checking passwords back to back. Pooled: --threads
+callers going through website.passwords.authenticate(), so the pool size
+(PASSWORD_WORKERS, one per core by default) sets the ceiling. The unknown-email
+column should match the wrong-password one: both pay for one hash check.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from flask_bcrypt import check_password_hash, generate_password_hash
+
+from website import create_app, db
+from website.migrations import upgrade
+from website.models import User
+from website.passwords import authenticate
+
+PASSWORD = "Bench!mark1"
+
+
+def _per_core(rounds: int, logins: int) -> float:
+    hashed = generate_password_hash(PASSWORD, rounds)
+    started = time.perf_counter()
+    for _ in range(logins):
+        check_password_hash(hashed, PASSWORD)
+    return logins / (time.perf_counter() - started)
+
+
+def _login_ms(email: str, password: str, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        authenticate(email, password)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _pooled(app, logins: int, threads: int) -> float:
+    def caller(count):
+        with app.app_context():
+            for _ in range(count):
+                assert authenticate("bench@example.com", PASSWORD) is not None
+            db.session.remove()
+
+    per_thread = [logins // threads + (1 if i < logins % threads else 0) for i in range(threads)]
+    workers = [threading.Thread(target=caller, args=(n,)) for n in per_thread]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return logins / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", default="10,11,12,13")
+    parser.add_argument("--logins", type=int, default=40, help="logins timed per cost and mode")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent callers for the pooled run")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores")
+    print(f"{'cost':>5}{'per core/s':>12}{'pooled/s':>10}{'wrong pw ms':>13}{'unknown ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rounds in [int(c) for c in args.costs.split(",")]:
+            app = create_app({
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, f'bench{rounds}.sqlite')}",
+                "TESTING": True,
+                "BCRYPT_LOG_ROUNDS": rounds,
+            })
+            with app.app_context():
+                upgrade()
+                db.session.add(User(
+                    first_name="Bench", last_name="Mark", email="bench@example.com",
+                    password_hash=generate_password_hash(PASSWORD, rounds).decode(),
+                ))
+                db.session.commit()
+                wrong_ms = _login_ms("bench@example.com", "not the password")
+                unknown_ms = _login_ms("nobody@example.com", PASSWORD)
+                db.session.remove()
+            per_core = _per_core(rounds, args.logins)
+            pooled = _pooled(app, args.logins, args.threads)
+            print(f"{rounds:>5}{per_core:>12.1f}{pooled:>10.1f}{wrong_ms:>13.1f}{unknown_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Fail if a page runs more SQL statements than its budget.
+
+    python -m benchmarks.query_budgets
+
+Requests each page through the test client, logged in, inside
+instrumentation.max_queries(). The fragment and user caches are off, so
+every request does all of its work against the database: the numbers are
+what a cache miss costs. The event page has 5 comments and the user has 5
+bookings. A budget that does not grow with those rows is the point: an N+1
+would add a statement per row. Exits non-zero if any page is over budget.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, datetime, time as dtime
+
+from flask_bcrypt import generate_password_hash
+
+from website import create_app, db
+from website.instrumentation import max_queries
+from website.migrations import upgrade
+from website.models import Comment, Event, Order, User
+
+PASSWORD = "Bench!mark1"
+ROWS = 5  # comments on the event, bookings of the user
+
+# endpoint -> (path, statements allowed); every budget includes the user loader
+BUDGETS = {
+    # user, featured carousel, card page, facet counts
+    "main.index": ("/", 4),
+    # ETag validators, user, event with creator, one page of comments with authors
+    "event.show": ("/events/1", 4),
+    # user, orders with their events
+    "event.my_bookings": ("/events/books", 2),
+}
+
+
+def _seed():
+    user = User(
+        first_name="Bench", last_name="Mark", email="bench@example.com",
+        password_hash=generate_password_hash(PASSWORD, 4).decode(),
+    )
+    db.session.add(user)
+    events = [
+        Event(
+            title=f"Show {i}", genre="Rock", venue="Hall", description="live", date=date(2030, 1, 1 + i),
+            start_time=dtime(20), door_time=dtime(19), quantity=100, price=10, creator=user,
+            featuredevent=i < 2,
+        )
+        for i in range(ROWS)
+    ]
+    db.session.add_all(events)
+    db.session.flush()
+    for i in range(ROWS):
+        db.session.add(Comment(text=f"Comment {i}", user=user, event_id=events[0].id, created_at=datetime.now()))
+        db.session.add(Order(
+            user=user, event_id=events[i].id, quantity=1, total_price=10, order_date=datetime.now(),
+        ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    over = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "SLOW_LOG_PATH": None,
+            "CACHE_BACKEND": "none",
+            "USER_CACHE_TTL": 0,
+        })
+        with app.app_context():
+            upgrade()
+            _seed()
+        client = app.test_client()
+        response = client.post("/login", data={"email": "bench@example.com", "password": PASSWORD})
+        if response.status_code != 302:
+            sys.exit(f"login failed with {response.status_code}")
+
+        for endpoint, (path, budget) in BUDGETS.items():
+            with app.app_context():
+                try:
+                    with max_queries(budget) as counter:
+                        response = client.get(path)
+                except AssertionError as exc:
+                    over.append(endpoint)
+                    print(f"[OVER] {endpoint} {path}: {exc}")
+                    continue
+            if response.status_code != 200:
+                over.append(endpoint)
+                print(f"[FAIL] {endpoint} {path}: HTTP {response.status_code}")
+                continue
+            print(f"[ok] {endpoint} {path}: {counter.count} of {budget} statements")
+
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
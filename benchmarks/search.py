@@ -0,0 +1,103 @@
+"""Compare the old ILIKE search with the search index at several catalogue sizes.
+
+    python -m benchmarks.search --sizes 10000,100000,1000000
+
+Each size gets its own throwaway SQLite database under a temp directory. Both sides
+return the first PER_PAGE events and the total match count.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+from sqlalchemy import insert, or_
+
+from website import create_app, db
+from website.migrations import upgrade
+from website.models import Event, User
+from website.search import get_index, rebuild_index, search_events
+
+WORDS = (
+    "rock jazz pop indie night live tour festival acoustic orchestra "
+    "summer winter soul blues electric session garden arena hall club"
+).split()
+QUERIES = ["rock", "jaz", "summer festival", "acoustic night", "orch", "garden tour"]
+PER_PAGE = 20  # both sides fetch one page and count the matches
+
+
+def _seed(count: int, batch: int = 10_000):
+    user = User(first_name="Bench", last_name="Mark", email="bench@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    rng = random.Random(42)
+    start = date.today()
+    for offset in range(0, count, batch):
+        rows = [
+            {
+                "title": " ".join(rng.sample(WORDS, 3)).title(),
+                "genre": rng.choice(["Rock", "Jazz", "Pop", "Hip Hop", "Electronic", "Classical"]),
+                "venue": f"{rng.choice(WORDS).title()} Hall",
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "date": start + timedelta(days=rng.randint(0, 365)),
+                "start_time": dtime(20),
+                "door_time": dtime(19),
+                "quantity": 100,
+                "price": 50.0,
+                "status": "Open",
+                "creator_id": user.id,
+            }
+            for _ in range(min(batch, count - offset))
+        ]
+        db.session.execute(insert(Event), rows)
+    db.session.commit()
+
+
+def _ilike(query_text, per_page: int = PER_PAGE):
+    """The old search, doing the same work as search_events(): one page of events plus the total."""
+    pattern = f"%{query_text}%"
+    match = or_(Event.title.ilike(pattern), Event.description.ilike(pattern))
+    events = db.session.scalars(db.select(Event).where(match).order_by(Event.id).limit(per_page)).all()
+    total = db.session.scalar(db.select(db.func.count()).select_from(Event).where(match))
+    return events, total
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        for q in QUERIES:
+            started = time.perf_counter()
+            fn(q)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bench.sqlite",
+                "TESTING": True,
+            })
+            with app.app_context():
+                upgrade()
+                _seed(size)
+                rebuild_index()
+                ilike_ms = _time(_ilike, args.repeat)
+                index_ms = _time(lambda q: search_events(q, per_page=PER_PAGE), args.repeat)
+                print(
+                    f"{size:>9} events | ILIKE {ilike_ms:9.2f} ms | "
+                    f"{get_index().name} {index_ms:8.2f} ms (median per query)"
+                )
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
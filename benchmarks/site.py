@@ -0,0 +1,329 @@
+"""Load-test the whole site against a seeded dataset and save the results as JSON.
+
+    python -m benchmarks.site --scale small --driver client --requests 2000
+    python -m benchmarks.site --scale medium --driver server --concurrency 8 --output results/after.json
+    python -m benchmarks.site --scale medium --driver server --compare results/before.json
+
+--driver client calls the app through Flask's test client (no network, one
+thread); --driver server runs it under a threaded local WSGI server and hits it
+from --concurrency client threads over HTTP. The request mix covers the home
+page with each filter, search, event pages, login and ticket purchases; see MIX.
+Latency is measured at the client; queries per request come from the app's
+own request profiler. Data comes from benchmarks.datagen, so the same
+--scale and --seed give the same database on every commit.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.datagen import BENCH_PASSWORD, SCALES, WORDS, seed
+from website import create_app, db
+from website.migrations import upgrade
+from website.models import Event
+
+# scenario name -> (weight, endpoint the profiler files it under)
+MIX = {
+    "home:all": (20, "main.index"),
+    "home:today": (5, "main.index"),
+    "home:weekend": (5, "main.index"),
+    "home:past": (5, "main.index"),
+    "search": (15, "main.search"),
+    "event": (35, "event.show"),
+    "login": (3, "auth.login"),
+    "purchase": (12, "event.purchase"),
+}
+
+
+# -------------------------------------
+# Drivers
+# -------------------------------------
+class ClientDriver:
+    """One virtual user on Flask's test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None) -> int:
+        return self.client.open(path, method=method, data=data).status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # time only the request itself, as the test client does
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class HttpDriver:
+    """One virtual user over HTTP, with its own cookie jar."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, data=None) -> int:
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+
+# -------------------------------------
+# Workload
+# -------------------------------------
+class Workload:
+    """Picks requests from MIX using ids that exist in the seeded data."""
+
+    def __init__(self, users: int, event_ids: list, upcoming_ids: list):
+        self.users = users
+        self.event_ids = event_ids
+        self.upcoming_ids = upcoming_ids or event_ids
+        self.names = list(MIX)
+        self.weights = [MIX[name][0] for name in self.names]
+
+    def credentials(self, rng) -> dict:
+        return {"email": f"user{rng.randrange(self.users)}@bench.example.com", "password": BENCH_PASSWORD}
+
+    def next(self, rng):
+        """Return (scenario, method, path, form data)."""
+        name = rng.choices(self.names, self.weights)[0]
+        if name.startswith("home:"):
+            return name, "GET", f"/?filter={name.split(':')[1]}", None
+        if name == "search":
+            terms = " ".join(rng.sample(WORDS, rng.choice((1, 1, 2))))
+            return name, "GET", "/search?" + urllib.parse.urlencode({"search": terms}), None
+        if name == "event":
+            return name, "GET", f"/events/{rng.choice(self.event_ids)}", None
+        if name == "login":
+            return name, "POST", "/login", self.credentials(rng)
+        return name, "POST", f"/events/{rng.choice(self.upcoming_ids)}/purchase", {"quantity": 1}
+
+
+def _virtual_user(driver, workload, rng, count, results):
+    status = driver.request("POST", "/login", workload.credentials(rng))
+    if status != 302:
+        raise RuntimeError(f"benchmark login failed with HTTP {status}")
+    for _ in range(count):
+        name, method, path, data = workload.next(rng)
+        started = time.perf_counter()
+        status = driver.request(method, path, data)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        results.append((name, elapsed_ms, status >= 400))
+
+
+def run(app, workload, driver: str, total: int, concurrency: int, seed_value: int):
+    """Drive `total` requests through the app. Returns (samples, wall seconds)."""
+    results = []  # list.append is atomic, so the client threads can share it
+    per_user = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    server = None
+    if driver == "server":
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def make_driver():
+        return HttpDriver(base_url) if server else ClientDriver(app)
+
+    started = time.perf_counter()
+    try:
+        if driver == "client":
+            for i, count in enumerate(per_user):
+                _virtual_user(make_driver(), workload, random.Random(seed_value + i), count, results)
+        else:
+            errors = []
+
+            def worker(i, count):
+                try:
+                    _virtual_user(make_driver(), workload, random.Random(seed_value + i), count, results)
+                except Exception as exc:  # surfaced after join
+                    errors.append(exc)
+
+            threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_user)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            if errors:
+                raise errors[0]
+    finally:
+        if server:
+            server.shutdown()
+    return results, time.perf_counter() - started
+
+
+# -------------------------------------
+# Reporting
+# -------------------------------------
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _latency(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(_percentile(ordered, 50), 2),
+        "p95_ms": round(_percentile(ordered, 95), 2),
+        "p99_ms": round(_percentile(ordered, 99), 2),
+        "mean_ms": round(statistics.fmean(ordered), 2) if ordered else 0.0,
+    }
+
+
+def summarize(results, wall_seconds, profile: dict) -> dict:
+    by_name = {}
+    for name, elapsed_ms, failed in results:
+        entry = by_name.setdefault(name, {"samples": [], "errors": 0})
+        entry["samples"].append(elapsed_ms)
+        entry["errors"] += failed
+
+    scenarios = {}
+    for name in MIX:
+        if name not in by_name:
+            continue
+        samples = by_name[name]["samples"]
+        endpoint = MIX[name][1]
+        scenarios[name] = {
+            "requests": len(samples),
+            "errors": by_name[name]["errors"],
+            "throughput_rps": round(len(samples) / wall_seconds, 1),
+            **_latency(samples),
+            # per endpoint: the home filters share main.index
+            "queries_per_request": profile.get(endpoint, {}).get("avg_sql_statements"),
+        }
+    return {
+        "requests": len(results),
+        "errors": sum(failed for _, _, failed in results),
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_rps": round(len(results) / wall_seconds, 1),
+        **_latency([elapsed_ms for _, elapsed_ms, _ in results]),
+        "scenarios": scenarios,
+    }
+
+
+def print_report(summary: dict, baseline: dict | None = None):
+    base = (baseline or {}).get("summary", {}).get("scenarios", {})
+    print(f"{'scenario':<14}{'reqs':>7}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'sql/req':>9}")
+    rows = list(summary["scenarios"].items()) + [("TOTAL", summary)]
+    for name, s in rows:
+        sql = s.get("queries_per_request")
+        print(f"{name:<14}{s['requests']:>7}{s['errors']:>5}{s['throughput_rps']:>9.1f}"
+              f"{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}"
+              f"{'' if sql is None else f'{sql:.1f}':>9}")
+        old = base.get(name) if name != "TOTAL" else (baseline or {}).get("summary")
+        if old:
+            old_sql = old.get("queries_per_request")
+            print(f"{'  vs base':<14}{'':>7}{'':>5}{_delta(s['throughput_rps'], old['throughput_rps']):>9}"
+                  f"{_delta(s['p50_ms'], old['p50_ms']):>9}{_delta(s['p95_ms'], old['p95_ms']):>9}"
+                  f"{_delta(s['p99_ms'], old['p99_ms']):>9}"
+                  f"{'' if sql is None or old_sql is None else f'{sql - old_sql:+.1f}':>9}")
+
+
+def _delta(new, old):
+    return f"{(new - old) / old * 100:+.0f}%" if old else ""
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -------------------------------------
+# Entry point
+# -------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--driver", choices=("client", "server"), default="client")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads (server driver only)")
+    parser.add_argument("--warmup", type=int, default=100, help="untimed requests before the run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run to diff against")
+    args = parser.parse_args()
+    concurrency = args.concurrency if args.driver == "server" else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+            "WTF_CSRF_ENABLED": False,
+            "SLOW_LOG_PATH": None,
+            "TESTING": True,  # no background jobs mid-run
+        })
+        with app.app_context():
+            upgrade()
+            print(f"Seeding scale={args.scale} seed={args.seed}")
+            counts = seed(args.scale, args.seed)
+            event_ids = list(db.session.scalars(db.select(Event.id)))
+            upcoming_ids = list(db.session.scalars(
+                db.select(Event.id).where(Event.date >= date.today(), Event.status == "Open")
+            ))
+            db.session.remove()
+        workload = Workload(counts["users"], event_ids, upcoming_ids)
+
+        if args.warmup:
+            run(app, workload, args.driver, args.warmup, concurrency, args.seed + 10_000)
+        profiler = app.extensions["profiler"]
+        profiler.reset()
+        print(f"Running {args.requests} requests, driver={args.driver}, concurrency={concurrency}")
+        results, wall = run(app, workload, args.driver, args.requests, concurrency, args.seed)
+        summary = summarize(results, wall, profiler.snapshot())
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        print(f"Baseline: {args.compare} (commit {baseline['meta'].get('commit')})")
+    print_report(summary, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fp:
+            json.dump({
+                "meta": {
+                    "commit": _git_commit(),
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                    "scale": args.scale,
+                    "seed": args.seed,
+                    "driver": args.driver,
+                    "concurrency": concurrency,
+                    "rows": counts,
+                    "mix": {name: weight for name, (weight, _) in MIX.items()},
+                },
+                "summary": summary,
+            }, fp, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
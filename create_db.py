@@ -1,6 +1,7 @@
-from website import db, create_app
+from website import create_app
+from website.migrations import upgrade
 app = create_app()
 ctx = app.app_context()
 ctx.push()
-db.create_all()
-quit()
\ No newline at end of file
+upgrade()
+quit()
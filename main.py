@@ -1,7 +1,8 @@
 from website import create_app
 
 if __name__ == '__main__':
-    app = create_app()
+    # a single-process development server: it runs the periodic jobs itself
+    app = create_app({'RUN_SCHEDULERS': True})
     app.run()
 
     
\ No newline at end of file
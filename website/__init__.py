@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request
+from flask import Flask, flash, redirect, render_template, request
 from flask_bootstrap import Bootstrap5
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -6,8 +6,11 @@ import logging
 from logging.handlers import RotatingFileHandler
 import os
 
+from .readonly import RoutingSession
+
 # Initialize extensions
-db = SQLAlchemy()
+# (RoutingSession sends @read_only views to the read-only engine, see readonly.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 # ---- Error Handlers ----
@@ -18,6 +21,14 @@ def register_error_handlers(app):
         app.logger.info("404 at %s", request.path)
         return render_template("errors/404.html"), 404
 
+    @app.errorhandler(413)
+    def too_large(e):
+        # the body was never read, so send the user back to the form they came from
+        app.logger.info("413 at %s (%s bytes)", request.path, request.content_length)
+        limit = app.config['MAX_IMAGE_BYTES'] // (1024 * 1024)
+        flash(f"That upload is too large. Images must be under {limit} MB.", "danger")
+        return redirect(request.path), 303
+
     @app.errorhandler(500)
     def server_error(e):
         # ensure any failed transaction is rolled back
@@ -31,27 +42,146 @@ def register_error_handlers(app):
 
 
 # ---- Application Factory ----
-def create_app():
+def create_app(config=None):
+    from .database import configure_engine_options, database_url, init_database
+    from .readonly import configure_read_only_bind
+
     app = Flask(__name__)
     app.debug = False  # Set to False in production
     app.secret_key = 'somesecretkey'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sitedata.sqlite'
+    # DATABASE_URL (e.g. postgresql://user:pw@host/eventfinder) overrides the local SQLite file
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url('sqlite:///sitedata.sqlite')
+
+    # ---- Database tuning ----
+    # SQLite: WAL lets the listing pages keep reading while a purchase writes
+    app.config['SQLITE_JOURNAL_MODE'] = 'wal'  # '' leaves the file's current mode alone
+    app.config['SQLITE_SYNCHRONOUS'] = 'normal'  # safe with WAL; 'full' fsyncs every commit
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = 5000
+    app.config['SQLITE_CACHE_SIZE_KB'] = 16384
+    app.config['SQLITE_MMAP_SIZE'] = 128 * 1024 * 1024
+    # connection pool (file SQLite and PostgreSQL)
+    app.config['DB_POOL_SIZE'] = 10
+    app.config['DB_MAX_OVERFLOW'] = 20
+    app.config['DB_POOL_TIMEOUT'] = 30  # seconds to wait for a free connection
+    app.config['DB_POOL_RECYCLE'] = 1800  # seconds
+    # @read_only routes read from READ_REPLICA_URL, or the SQLite file opened mode=ro
+    app.config['READ_ONLY_ROUTING'] = True
+    app.config['READ_REPLICA_URL'] = os.environ.get('READ_REPLICA_URL')
+
+    # ---- Periodic jobs (hold sweeper, status refresh, sales rollup) ----
+    # in-process threads; enable in one process only, or run `flask run-schedulers` instead
+    app.config['RUN_SCHEDULERS'] = os.environ.get('RUN_SCHEDULERS', '') == '1'
+
+    # ---- Ticket holds ----
+    app.config['TICKET_HOLD_MINUTES'] = 10
+    app.config['HOLD_SWEEP_INTERVAL'] = 60  # seconds, 0 disables the sweeper thread
+    app.config['HOLD_SWEEP_BATCH'] = 500
+
+    # ---- Event status maintenance ----
+    app.config['STATUS_REFRESH_INTERVAL'] = 3600  # seconds, 0 disables the in-process job
+
+    # ---- Sales analytics ----
+    app.config['ANALYTICS_ROLLUP_INTERVAL'] = 300  # seconds, 0 disables the in-process job
+    app.config['ANALYTICS_ROLLUP_BATCH'] = 5000  # orders folded in per transaction
+    app.config['ANALYTICS_ROLLUP_SETTLE'] = 60  # seconds; younger orders wait for the next run
+
+    # ---- Listing pages (keyset pagination) ----
+    app.config['PAGE_SIZE'] = 12
+    app.config['MAX_PAGE_SIZE'] = 48
+    app.config['COMMENTS_PAGE_SIZE'] = 20  # comments per page on the event page
+
+    # ---- Search ----
+    app.config['SEARCH_BACKEND'] = 'auto'  # 'fts5', 'python' or 'auto' (fts5 when SQLite supports it)
+    app.config['SEARCH_PAGE_SIZE'] = 12
+
+    # ---- Fragment cache ----
+    app.config['CACHE_BACKEND'] = 'memory'  # 'memory', 'redis' or 'none'
+    app.config['CACHE_MAX_ENTRIES'] = 512
+    app.config['CACHE_TTL'] = 300  # seconds
+    app.config['CACHE_REDIS_URL'] = 'redis://localhost:6379/0'
+
+    # ---- Profiling ----
+    app.config['SLOW_REQUEST_MS'] = 500
+    app.config['SLOW_QUERY_MS'] = 100
+    app.config['SLOW_LOG_PATH'] = 'instance/slow_requests.log'
+    app.config['ADMIN_EMAILS'] = set(filter(None, os.environ.get('ADMIN_EMAILS', '').split(',')))
+
+    # ---- Image uploads ----
+    app.config['IMAGE_WORKERS'] = 2  # threads resizing uploads into thumb/card/hero variants
+    app.config['MAX_IMAGE_BYTES'] = 5 * 1024 * 1024
+    # whole request body; larger requests get a 413 before the body is read
+    app.config['MAX_CONTENT_LENGTH'] = 6 * 1024 * 1024
+
+    # ---- Live availability (Server-Sent Events) ----
+    app.config['AVAILABILITY_COALESCE_MS'] = 250  # at most one update per stream in this window
+    app.config['AVAILABILITY_HEARTBEAT'] = 15  # seconds between keep-alive comments
+    app.config['AVAILABILITY_STREAM_SECONDS'] = 300  # then the browser reconnects
+
+    # ---- Logged-in user cache ----
+    app.config['USER_CACHE_TTL'] = 30  # seconds a cached user is trusted, 0 disables
+    app.config['USER_CACHE_MAX_ENTRIES'] = 2048
+
+    # ---- Passwords ----
+    app.config['BCRYPT_LOG_ROUNDS'] = 12  # cost of new hashes; older hashes are upgraded at login
+    app.config['PASSWORD_WORKERS'] = os.cpu_count() or 2  # threads running bcrypt
+    app.config['PASSWORD_MAX_PENDING'] = 64  # hashes running or queued before logins are turned away
+    app.config['PASSWORD_QUEUE_TIMEOUT'] = 5  # seconds a login waits for a slot
+
+    # ---- Background jobs (flask jobs-worker) ----
+    app.config['JOB_WORKER_THREADS'] = 4
+    app.config['JOB_POLL_INTERVAL'] = 1.0  # seconds between polls when the queue is empty
+    app.config['JOB_MAX_ATTEMPTS'] = 5  # then the job is marked failed
+    app.config['JOB_RETRY_BASE'] = 10  # seconds before the first retry, doubled each attempt
+    app.config['JOB_RETRY_MAX'] = 3600
+    app.config['JOB_LOCK_TIMEOUT'] = 600  # seconds before a running job is presumed lost and retried
+    app.config['JOB_FANOUT_BATCH'] = 200  # ticket holders per cancellation batch
+    app.config['REFUND_BATCH'] = 1000  # orders refunded per transaction when an event is cancelled
+
+    # ---- Email ----
+    app.config['MAIL_BACKEND'] = 'log'  # 'smtp' to deliver, 'log' only writes a line to the app log
+    app.config['MAIL_SERVER'] = 'localhost'
+    app.config['MAIL_PORT'] = 1025  # `flask smtp-sink` listens here
+    app.config['MAIL_TIMEOUT'] = 10
+    app.config['MAIL_SENDER'] = 'EventFinder <no-reply@eventfinder.example.com>'
+
+    # ---- Static assets ----
+    app.config['ASSET_FINGERPRINTS'] = True  # hashed /assets/ URLs with far-future caching
+    app.config['ASSET_CACHE_DIR'] = None  # precompressed copies, defaults to instance/assets
+
+    # overrides (e.g. a test or benchmark database)
+    if config:
+        app.config.update(config)
 
     # Initialize extensions
+    configure_engine_options(app)
+    configure_read_only_bind(app)
     db.init_app(app)
+    init_database(app)
     Bootstrap5(app)
 
+    from .cache import init_cache
+    init_cache(app)
+
+    from .instrumentation import init_profiling
+    init_profiling(app)
+    from .images import init_images
+    init_images(app)
+    from .assets import init_assets
+    init_assets(app)
+    from .passwords import init_passwords
+    init_passwords(app)
+    from .availability import init_availability
+    init_availability(app)
+
     # ---- Login Manager ----
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
 
-    # Import here to avoid circular imports
-    from .models import User
-
-    @login_manager.user_loader
-    def load_user(user_id):
-        return db.session.scalar(db.select(User).where(User.id == user_id))
+    # cached: most authenticated requests need no SELECT on users (see usercache.py)
+    from .usercache import init_user_cache, load_user
+    init_user_cache(app)
+    login_manager.user_loader(load_user)
 
     # ---- Register Blueprints ----
     from . import views
@@ -63,6 +193,20 @@ def create_app():
     from . import events
     app.register_blueprint(events.events_bp)
 
+    from . import admin
+    app.register_blueprint(admin.admin_bp)
+
+    from . import assets
+    app.register_blueprint(assets.assets_bp)
+
+    from . import analytics
+    app.register_blueprint(analytics.analytics_bp)
+
+    # keeps the search index in step with Event writes
+    from . import search  # noqa: F401
+    # registers the background job tasks
+    from . import notifications, refunds  # noqa: F401
+
     # ---- Logging (only in production) ----
     if not app.debug:
         os.makedirs('instance', exist_ok=True)
@@ -74,4 +218,14 @@ def create_app():
     # ---- Register Error Handlers ----
     register_error_handlers(app)
 
+    # ---- CLI Commands ----
+    from .commands import register_commands
+    register_commands(app)
+
+    # ---- Background Jobs ----
+    # opt-in, so CLI commands and extra server processes never run them (see `flask run-schedulers`)
+    if app.config['RUN_SCHEDULERS'] and not app.testing:
+        from .scheduler import start_schedulers
+        start_schedulers(app)
+
     return app
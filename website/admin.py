@@ -0,0 +1,36 @@
+from functools import wraps
+
+from flask import Blueprint, abort, current_app, jsonify
+from flask_login import current_user, login_required
+
+from . import db
+from .cache import get_cache
+from .database import describe
+from .jobs import queue_stats
+from .usercache import get_user_cache
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+def admin_required(view):
+    """Only users whose email is listed in ADMIN_EMAILS; everyone else gets a 404."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.email not in current_app.config['ADMIN_EMAILS']:
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@admin_bp.route('/metrics')
+@admin_required
+def metrics():
+    """Per-endpoint latency histograms, SQL/template timings, cache counters and DB settings."""
+    return jsonify(
+        endpoints=current_app.extensions['profiler'].snapshot(),
+        cache=get_cache().stats(),
+        user_cache=get_user_cache().stats(),
+        jobs=queue_stats(),
+        database=describe(db.engine),
+    )
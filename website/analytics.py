@@ -0,0 +1,218 @@
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import update
+
+from . import db
+from .models import Event, JobState, Order, SalesDaily, SalesHourly
+from .readonly import read_only
+
+
+ROLLUP_JOB = "sales-rollup"
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
+
+
+# -------------------------------------
+# Rollups
+# -------------------------------------
+def _upsert(model, rows: list[dict]):
+    """Add each row's counts onto the existing bucket row, creating it if needed."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = model.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.event_id, table.c.bucket],
+        set_={
+            "orders": table.c.orders + stmt.excluded.orders,
+            "tickets": table.c.tickets + stmt.excluded.tickets,
+            "revenue": table.c.revenue + stmt.excluded.revenue,
+        },
+    )
+    db.session.execute(stmt, rows)
+
+
+def _bucket_rows(orders):
+    hourly = defaultdict(lambda: [0, 0, 0.0])
+    daily = defaultdict(lambda: [0, 0, 0.0])
+    for order in orders:
+        placed = order.order_date or datetime.now()
+        for totals in (
+            hourly[(order.event_id, placed.replace(minute=0, second=0, microsecond=0))],
+            daily[(order.event_id, placed.date())],
+        ):
+            totals[0] += 1
+            totals[1] += order.quantity
+            totals[2] += order.total_price
+
+    def as_rows(buckets):
+        return [
+            {"event_id": event_id, "bucket": bucket, "orders": n, "tickets": tickets, "revenue": revenue}
+            for (event_id, bucket), (n, tickets, revenue) in buckets.items()
+        ]
+    return as_rows(hourly), as_rows(daily)
+
+
+def _settled(orders, cutoff):
+    """The leading orders placed before `cutoff`; stops at the first newer one."""
+    for i, order in enumerate(orders):
+        if order.order_date is not None and order.order_date > cutoff:
+            return orders[:i]
+    return orders
+
+
+def rollup_sales(batch_size: int | None = None, settle_seconds: float | None = None) -> JobState:
+    """Fold orders placed since the last run into the hourly and daily rollups.
+
+    The watermark is the highest Order.id already counted. Each batch is
+    upserted and the watermark advanced in one transaction, with a
+    compare-and-set on the old value so two overlapping runs can never
+    count the same orders twice. Returns the JobState row with the run stats.
+
+    Ids are handed out before commit (on PostgreSQL, in any order), so an
+    order can become visible after a higher id was already counted. The
+    watermark therefore stops at the first order younger than
+    `settle_seconds` (ANALYTICS_ROLLUP_SETTLE): by the time that order is
+    counted, every lower id has been committed or rolled back.
+    """
+    config = current_app.config
+    batch_size = batch_size or config["ANALYTICS_ROLLUP_BATCH"]
+    settle_seconds = config["ANALYTICS_ROLLUP_SETTLE"] if settle_seconds is None else settle_seconds
+    started = time.perf_counter()
+    cutoff = datetime.now() - timedelta(seconds=settle_seconds)
+
+    if db.session.get(JobState, ROLLUP_JOB) is None:
+        db.session.add(JobState(name=ROLLUP_JOB, watermark="0"))
+        db.session.commit()
+
+    counted = 0
+    while True:
+        watermark = db.session.scalar(db.select(JobState.watermark).where(JobState.name == ROLLUP_JOB))
+        orders = db.session.execute(
+            db.select(Order.id, Order.event_id, Order.order_date, Order.quantity, Order.total_price)
+            .where(Order.id > int(watermark))
+            .order_by(Order.id)
+            .limit(batch_size)
+        ).all()
+        fetched = len(orders)
+        orders = _settled(orders, cutoff)
+        if not orders:
+            break
+
+        hourly, daily = _bucket_rows(orders)
+        _upsert(SalesHourly, hourly)
+        _upsert(SalesDaily, daily)
+        claimed = db.session.execute(
+            update(JobState.__table__)
+            .where(JobState.name == ROLLUP_JOB, JobState.watermark == watermark)
+            .values(watermark=str(orders[-1].id))
+        ).rowcount
+        if not claimed:
+            # another run got there first; its counts stand
+            db.session.rollback()
+            break
+        db.session.commit()
+        counted += len(orders)
+        if fetched < batch_size or len(orders) < fetched:
+            break
+
+    state = db.session.get(JobState, ROLLUP_JOB)
+    state.last_run_at = datetime.now()
+    state.rows_touched = counted
+    state.duration_ms = (time.perf_counter() - started) * 1000
+    db.session.commit()
+
+    current_app.logger.info("Sales rollup: %d orders in %.1f ms", counted, state.duration_ms)
+    return state
+
+
+# -------------------------------------
+# Organizer API
+# -------------------------------------
+@analytics_bp.route('/sales')
+@login_required
+@read_only
+def sales():
+    """Sales over time, sell-through and revenue for the current user's events.
+
+    ?bucket=day (default, up to a year back) or hour (up to 31 days), ?days=30.
+    Orders, revenue and the series come from the rollup tables (as of the
+    last rollup), so the cost grows with buckets, not orders. Tickets sold
+    and left are the event's live counters.
+    """
+    bucket = "hour" if request.args.get("bucket") == "hour" else "day"
+    max_days = 31 if bucket == "hour" else 366
+    days = min(max(request.args.get("days", 30, type=int), 1), max_days)
+    rollup = SalesHourly if bucket == "hour" else SalesDaily
+    since = date.today() - timedelta(days=days - 1)
+    if bucket == "hour":
+        since = datetime.combine(since, datetime.min.time())
+
+    events = db.session.execute(
+        db.select(Event.id, Event.title, Event.date, Event.quantity, Event.tickets_sold)
+        .where(Event.creator_id == current_user.id)
+        .order_by(Event.date.desc(), Event.id.desc())
+    ).all()
+
+    totals = {
+        row.event_id: row
+        for row in db.session.execute(
+            db.select(
+                SalesDaily.event_id,
+                db.func.sum(SalesDaily.orders).label("orders"),
+                db.func.sum(SalesDaily.tickets).label("tickets"),
+                db.func.sum(SalesDaily.revenue).label("revenue"),
+            )
+            .join(Event, Event.id == SalesDaily.event_id)
+            .where(Event.creator_id == current_user.id)
+            .group_by(SalesDaily.event_id)
+        )
+    }
+
+    series = defaultdict(list)
+    for row in db.session.execute(
+        db.select(rollup.event_id, rollup.bucket, rollup.orders, rollup.tickets, rollup.revenue)
+        .join(Event, Event.id == rollup.event_id)
+        .where(Event.creator_id == current_user.id, rollup.bucket >= since)
+        .order_by(rollup.event_id, rollup.bucket)
+    ):
+        series[row.event_id].append({
+            "bucket": row.bucket.isoformat(),
+            "orders": row.orders,
+            "tickets": row.tickets,
+            "revenue": round(row.revenue, 2),
+        })
+
+    payload = []
+    for event in events:
+        total = totals.get(event.id)
+        # sold and left from the same event row, so sell-through matches the event page
+        # rather than mixing the lagging rollups with live stock
+        sold = event.tickets_sold
+        capacity = sold + event.quantity
+        payload.append({
+            "id": event.id,
+            "title": event.title,
+            "date": event.date.isoformat(),
+            "orders": total.orders if total else 0,
+            "tickets_sold": sold,
+            "tickets_left": event.quantity,
+            "sell_through": round(sold / capacity, 4) if capacity else None,
+            "revenue": round(total.revenue, 2) if total else 0.0,
+            "series": series.get(event.id, []),
+        })
+
+    state = db.session.get(JobState, ROLLUP_JOB)
+    return jsonify(
+        bucket=bucket,
+        since=since.isoformat(),
+        as_of=state.last_run_at.isoformat() if state and state.last_run_at else None,
+        events=payload,
+    )
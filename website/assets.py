@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, redirect, request, send_file
+
+try:
+    import brotli  # optional, only used to precompress text assets
+except ImportError:
+    brotli = None
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+# only text formats are worth compressing; images are already compressed
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+ENCODINGS = {"br": "br", "gz": "gzip"}  # file suffix -> Content-Encoding
+ONE_YEAR = 365 * 24 * 3600
+
+
+# -------------------------------------
+# Manifest
+# -------------------------------------
+def _fingerprint(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fp:
+        while chunk := fp.read(64 * 1024):
+            hasher.update(chunk)
+    return hasher.hexdigest()[:12]
+
+
+def _fingerprinted_name(filename: str, digest: str) -> str:
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+def _precompress(source: str, digest: str, cache_dir: str) -> set[str]:
+    """Write gzip (and brotli, if installed) copies of a text asset. Returns the encodings made."""
+    with open(source, "rb") as fp:
+        raw = fp.read()
+
+    compressors = {"gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+
+    made = set()
+    for suffix, compress in compressors.items():
+        target = os.path.join(cache_dir, f"{digest}.{suffix}")
+        if not os.path.exists(target):
+            data = compress(raw)
+            if len(data) >= len(raw):
+                continue
+            with open(target + ".part", "wb") as out:
+                out.write(data)
+            os.replace(target + ".part", target)
+        made.add(suffix)
+    return made
+
+
+def build_manifest(static_dir: str, cache_dir: str) -> dict:
+    """Hash every file under static/ and precompress the text ones.
+
+    Returns {filename: (digest, {encodings})}. Uploads are skipped: their
+    paths already contain a content hash (see images.store_original).
+    Compressed copies are named by content hash, so a restart only
+    compresses files that actually changed.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if d != "uploads"]
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_dir).replace(os.sep, "/")
+            digest = _fingerprint(path)
+            encodings = set()
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                encodings = _precompress(path, digest, cache_dir)
+            manifest[filename] = (digest, encodings)
+    return manifest
+
+
+def init_assets(app):
+    cache_dir = app.config["ASSET_CACHE_DIR"] or os.path.join(app.instance_path, "assets")
+    app.extensions["asset_cache_dir"] = cache_dir
+    app.extensions["asset_manifest"] = (
+        build_manifest(app.static_folder, cache_dir) if app.config["ASSET_FINGERPRINTS"] else {}
+    )
+    app.add_template_global(asset_url)
+
+    @app.after_request
+    def cache_uploads(response):
+        # uploads are stored under their content hash, so they never change
+        if request.endpoint == "static" and (request.view_args or {}).get("filename", "").startswith("uploads/"):
+            if response.status_code == 200:
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = ONE_YEAR
+                response.cache_control.immutable = True
+        return response
+
+
+# -------------------------------------
+# Template helper
+# -------------------------------------
+def asset_url(path):
+    """Fingerprinted URL for a static file.
+
+    Accepts a filename relative to static/ ('style/styles.css') or a stored
+    '/static/...' URL, as Event.image holds. Anything not in the manifest
+    (external URLs, uploads, fingerprinting switched off) is returned as is.
+    """
+    if not path:
+        return path
+    filename = path[len("/static/"):] if path.startswith("/static/") else path
+    entry = current_app.extensions["asset_manifest"].get(filename)
+    if entry is None:
+        return path if path.startswith(("/", "http:", "https:")) else f"/static/{path}"
+    return f"{assets_bp.url_prefix}/{_fingerprinted_name(filename, entry[0])}"
+
+
+# -------------------------------------
+# Serving
+# -------------------------------------
+def _split_fingerprint(name: str):
+    stem, ext = os.path.splitext(name)
+    stem, _, digest = stem.rpartition(".")
+    return stem + ext, digest
+
+
+def _accepted(encoding: str) -> bool:
+    return request.accept_encodings[encoding] > 0
+
+
+@assets_bp.route('/<path:name>')
+def serve(name):
+    filename, digest = _split_fingerprint(name)
+    entry = current_app.extensions["asset_manifest"].get(filename)
+    if entry is None:
+        abort(404)
+    if entry[0] != digest:
+        # a page cached from before the file changed; point it at the current copy
+        return redirect(asset_url(filename))
+
+    encodings = entry[1]
+    chosen = next((s for s in ("br", "gz") if s in encodings and _accepted(ENCODINGS[s])), None)
+
+    if chosen:
+        path = os.path.join(current_app.extensions["asset_cache_dir"], f"{digest}.{chosen}")
+        response = send_file(
+            path, mimetype=mimetypes.guess_type(filename)[0],
+            conditional=True, etag=f"{digest}-{chosen}", max_age=ONE_YEAR,
+        )
+        response.content_encoding = ENCODINGS[chosen]
+    else:
+        response = send_file(
+            os.path.join(current_app.static_folder, filename),
+            conditional=True, etag=digest, max_age=ONE_YEAR,
+        )
+
+    if encodings:
+        response.vary.add("Accept-Encoding")
+    response.cache_control.immutable = True
+    return response
@@ -1,8 +1,8 @@
 from flask import Blueprint, flash, render_template, request, url_for, redirect
-from flask_bcrypt import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user
 from .models import User
 from .forms import LoginForm, RegisterForm
+from .passwords import PasswordHashingBusy, authenticate, hash_password
 from . import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -15,17 +15,18 @@ def login():
     if login_form.validate_on_submit():
         email = login_form.email.data
         password = login_form.password.data
-        user = db.session.scalar(db.select(User).where(User.email==email))
-        #if there is no user with that name
+        try:
+            user = authenticate(email, password)
+        except PasswordHashingBusy:
+            flash('Too many people are signing in right now. Please try again in a moment.', 'warning')
+            return render_template('user.html', form=login_form, heading='Login'), 503
+        # one message for both cases, so the form doesn't reveal which emails are registered
         if user is None:
-            error = 'Incorrect email'
-        elif not check_password_hash(user.password_hash, password):
-            error = 'Incorrect password'
+            error = 'Incorrect email or password'
         if error is None:
             #all good, set the login_user of flask_login to manage the user
             login_user(user)
             nextp = request.args.get('next')
-            print(nextp)
             if nextp is None or not nextp.startswith('/'):
                 return redirect(url_for('main.index'))
             return redirect(nextp)
@@ -50,13 +51,18 @@ def register():
             return redirect(url_for("auth.login"))
         
         # Otherwise, create new user
+        try:
+            password_hash = hash_password(register_form.password.data)
+        except PasswordHashingBusy:
+            flash("We're very busy right now. Please try again in a moment.", "warning")
+            return render_template('user.html', form=register_form, heading='Register'), 503
         user = User(
             first_name = register_form.first_name.data,
             last_name = register_form.last_name.data,
             contact_number = register_form.contact_number.data,
             street_address = register_form.street_address.data,
             email = register_form.email.data,
-            password_hash = generate_password_hash(register_form.password.data)
+            password_hash = password_hash
         )
 
         db.session.add(user)
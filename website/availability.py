@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+
+from flask import Response, current_app
+
+from . import db
+from .models import Event
+
+
+# -------------------------------------
+# In-process pub/sub
+# -------------------------------------
+class _Channel:
+    """Latest availability of one event plus everyone waiting on it."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.state = None
+        self.seq = 0
+        self.subscribers = 0
+
+
+class Subscription:
+    def __init__(self, hub, event_id, channel, coalesce_s):
+        self.hub = hub
+        self.event_id = event_id
+        self.channel = channel
+        self.coalesce_s = coalesce_s
+        self.seen = channel.seq
+        self.last_sent = 0.0
+
+    def next(self, timeout: float):
+        """The newest state once it changes, or None after `timeout` seconds.
+
+        Never returns more often than once per coalesce window: everything
+        published while the subscriber waits out the window folds into the
+        one state it then receives.
+        """
+        deadline = time.monotonic() + timeout
+        pause = self.last_sent + self.coalesce_s - time.monotonic()
+        if pause > 0:
+            time.sleep(min(pause, timeout))
+        with self.channel.cond:
+            if not self.channel.cond.wait_for(
+                lambda: self.channel.seq != self.seen, max(deadline - time.monotonic(), 0)
+            ):
+                return None
+            self.seen = self.channel.seq
+            state = self.channel.state
+        self.last_sent = time.monotonic()
+        return state
+
+    def close(self):
+        if self.channel is not None:
+            self.hub._leave(self.event_id, self.channel)
+            self.channel = None
+
+
+class AvailabilityHub:
+    """Fans availability changes out to the open streams of one process.
+
+    Publishing is O(1) however many streams are open: it swaps in the new
+    state and wakes the waiters, and each waiter reads the latest state
+    itself. Streams therefore skip intermediate states instead of queueing
+    them. With several app processes each has its own hub. Publishers and
+    subscribers only meet if they run in the same process.
+    """
+
+    def __init__(self, coalesce_ms: float = 0):
+        self.coalesce_s = coalesce_ms / 1000
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id) -> Subscription:
+        with self._lock:
+            channel = self._channels.setdefault(int(event_id), _Channel())
+            channel.subscribers += 1
+        return Subscription(self, int(event_id), channel, self.coalesce_s)
+
+    def _leave(self, event_id, channel):
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers <= 0 and self._channels.get(event_id) is channel:
+                del self._channels[event_id]
+
+    def has_subscribers(self, event_id) -> bool:
+        return int(event_id) in self._channels
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(channel.subscribers for channel in self._channels.values())
+
+    def publish(self, event_id, state: dict):
+        channel = self._channels.get(int(event_id))
+        if channel is None:
+            return
+        with channel.cond:
+            channel.state = state
+            channel.seq += 1
+            channel.cond.notify_all()
+
+
+def init_availability(app):
+    app.extensions["availability"] = AvailabilityHub(app.config["AVAILABILITY_COALESCE_MS"])
+
+
+def get_hub() -> AvailabilityHub:
+    return current_app.extensions["availability"]
+
+
+# -------------------------------------
+# Publishing from the write paths
+# -------------------------------------
+def _current_state(event_id) -> dict | None:
+    row = db.session.execute(
+        db.select(Event.quantity, Event.status).where(Event.id == event_id)
+    ).first()
+    return {"quantity": row.quantity, "status": row.status} if row else None
+
+
+def publish_availability(event_id, quantity: int | None = None, status: str | None = None):
+    """Tell open streams about an event's tickets. Call after the commit.
+
+    Pass the new quantity and status when the caller already has them;
+    otherwise they are read back, but only if someone is listening.
+    """
+    hub = get_hub()
+    if not hub.has_subscribers(event_id):
+        return
+    if quantity is None or status is None:
+        state = _current_state(event_id)
+        if state is None:
+            return
+    else:
+        state = {"quantity": quantity, "status": status}
+    hub.publish(event_id, {"id": int(event_id), **state, "at": time.time()})
+
+
+# -------------------------------------
+# Server-Sent Events
+# -------------------------------------
+def _sse(state: dict) -> str:
+    return f"event: availability\ndata: {json.dumps(state)}\n\n"
+
+
+def availability_stream(event_id) -> Response | None:
+    """A text/event-stream of the event's quantity and status, None if there is no such event.
+
+    Sends the current state straight away, then each change. A comment line
+    goes out every AVAILABILITY_HEARTBEAT seconds to keep proxies from
+    closing an idle stream. Streams end after AVAILABILITY_STREAM_SECONDS.
+    The browser's EventSource then reconnects, which frees the worker
+    thread now and then.
+    """
+    config = current_app.config
+    heartbeat = config["AVAILABILITY_HEARTBEAT"]
+    lifetime = config["AVAILABILITY_STREAM_SECONDS"]
+
+    # subscribe before reading, so a change in between is sent rather than lost
+    subscription = get_hub().subscribe(event_id)
+    try:
+        state = _current_state(event_id)
+    except Exception:
+        subscription.close()
+        raise
+    if state is None:
+        subscription.close()
+        return None
+    state = {"id": int(event_id), **state, "at": time.time()}
+
+    def generate():
+        # runs after the request has finished: no database access in here
+        ends = time.monotonic() + lifetime
+        yield "retry: 5000\n" + _sse(state)
+        while time.monotonic() < ends:
+            update = subscription.next(min(heartbeat, ends - time.monotonic()))
+            yield ": keep-alive\n\n" if update is None else _sse(update)
+
+    response = Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: pass events through as they are written
+    })
+    # the server closes the response on disconnect, even before the first event
+    response.call_on_close(subscription.close)
+    return response
@@ -0,0 +1,213 @@
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+
+from flask import url_for
+from sqlalchemy import and_, case
+
+from . import db
+from .cache import cached_json
+from .models import Event
+from .pagination import Page, keyset_page
+
+# date windows, as given in ?filter=; "all" is the home page's name for upcoming
+WINDOWS = ("upcoming", "today", "weekend", "past", "any", "range")
+STATUSES = ("Open", "Sold Out", "Cancelled", "Inactive")
+
+
+def weekend_bounds(today: date) -> tuple[date, date]:
+    """This weekend's Saturday and Sunday (the current one on a weekend day)."""
+    weekday = today.weekday()  # Monday=0, Sunday=6
+    saturday = today + timedelta(days=(5 - weekday)) if weekday <= 4 else today if weekday == 5 else today - timedelta(days=1)
+    sunday = saturday + timedelta(days=1)
+    return saturday, sunday
+
+
+def _parse_date(value) -> date | None:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_price(value) -> float | None:
+    try:
+        price = float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+    return price if price is None or price >= 0 else None
+
+
+# -------------------------------------
+# Filters
+# -------------------------------------
+@dataclass(frozen=True)
+class Browse:
+    """One combination of listing filters. Every field is optional."""
+    window: str = "upcoming"
+    date_from: date | None = None
+    date_to: date | None = None
+    genre: str | None = None
+    price_min: float | None = None
+    price_max: float | None = None
+    status: str | None = None
+
+    @classmethod
+    def from_args(cls, args, default_window: str = "upcoming", **fixed) -> "Browse":
+        """Read ?filter=, ?from=/?to=, ?genre=, ?min_price=/?max_price= and ?status=.
+
+        Anything unrecognised falls back to "no filter" rather than an error,
+        as the date filter always has.
+        """
+        window = args.get("filter") or default_window
+        window = "upcoming" if window == "all" else window
+        date_from, date_to = _parse_date(args.get("from")), _parse_date(args.get("to"))
+        if date_from or date_to:
+            window = "range"
+        if window not in WINDOWS or (window == "range" and not (date_from or date_to)):
+            window = default_window
+        status = args.get("status")
+        return replace(cls(
+            window=window,
+            date_from=date_from if window == "range" else None,
+            date_to=date_to if window == "range" else None,
+            genre=(args.get("genre") or "").strip() or None,
+            price_min=_parse_price(args.get("min_price")),
+            price_max=_parse_price(args.get("max_price")),
+            status=status if status in STATUSES else None,
+        ), **fixed)
+
+    def args(self) -> dict:
+        """The query-string form, for building next-page and facet links."""
+        values = {
+            "filter": self.window if self.window != "range" else None,
+            "from": self.date_from.isoformat() if self.date_from else None,
+            "to": self.date_to.isoformat() if self.date_to else None,
+            "genre": self.genre,
+            "min_price": self.price_min,
+            "max_price": self.price_max,
+            "status": self.status,
+        }
+        return {k: v for k, v in values.items() if v is not None}
+
+    def key(self) -> str:
+        """Stable text form for cache keys and ETags."""
+        return "|".join(f"{k}={v}" for k, v in sorted(self.args().items()))
+
+    @property
+    def is_default(self) -> bool:
+        return self == Browse()
+
+
+# -------------------------------------
+# Query
+# -------------------------------------
+def _window_condition(window: str, today: date, date_from=None, date_to=None):
+    if window == "today":
+        return Event.date == today
+    if window == "weekend":
+        saturday, sunday = weekend_bounds(today)
+        return Event.date.between(saturday, sunday)
+    if window == "past":
+        return Event.date < today
+    if window == "range":
+        parts = []
+        if date_from:
+            parts.append(Event.date >= date_from)
+        if date_to:
+            parts.append(Event.date <= date_to)
+        return and_(*parts)
+    if window == "any":
+        return Event.date.is_not(None)
+    return Event.date >= today
+
+
+def _conditions(f: Browse, today: date, skip=()) -> list:
+    conditions = []
+    if "date" not in skip:
+        conditions.append(_window_condition(f.window, today, f.date_from, f.date_to))
+    if f.genre and "genre" not in skip:
+        # lower() on both sides so the lower(genre) index can be used
+        conditions.append(db.func.lower(Event.genre) == f.genre.lower())
+    if f.price_min is not None:
+        conditions.append(Event.price >= f.price_min)
+    if f.price_max is not None:
+        conditions.append(Event.price <= f.price_max)
+    if f.status:
+        conditions.append(Event.status == f.status)
+    return conditions
+
+
+def browse_query(f: Browse, today: date | None = None):
+    """Every filter in one WHERE clause, ordered by (date, id) for keyset paging.
+
+    The date window is a range on ix_events_date_id, or ix_events_genre_lower_date
+    when a genre is given; price and status narrow the rows found that way.
+    """
+    today = today or date.today()
+    return Event.query.filter(*_conditions(f, today)).order_by(Event.date.asc())
+
+
+def browse_page(f: Browse, cursor: str | None = None, limit: int | None = None) -> tuple[Page, Browse]:
+    """One page of events for the filters.
+
+    Returns the page and the filters it actually came from: the unfiltered
+    home page falls back to every event when nothing is upcoming, and later
+    pages must keep using that fallback.
+    """
+    page = keyset_page(browse_query(f), cursor, limit)
+    if not page.items and cursor is None and f.is_default:
+        f = replace(f, window="any")
+        page = keyset_page(browse_query(f), None, limit)
+    return page, f
+
+
+def next_page_url(endpoint: str, page: Page, f: Browse, **extra) -> str | None:
+    if not page.has_next:
+        return None
+    return url_for(endpoint, **f.args(), **extra, cursor=page.next_cursor)
+
+
+# -------------------------------------
+# Facets
+# -------------------------------------
+FACET_WINDOWS = ("upcoming", "today", "weekend", "past", "any")
+
+
+def _facet_rows(f: Browse, today: date):
+    """Per genre: count in each date window, and in the selected window. One GROUP BY."""
+    selected = _window_condition(f.window, today, f.date_from, f.date_to)
+    windows = [
+        db.func.sum(case((_window_condition(w, today), 1), else_=0)).label(w)
+        for w in FACET_WINDOWS
+    ]
+    return db.session.execute(
+        db.select(
+            db.func.lower(Event.genre).label("key"),
+            *windows,
+            db.func.sum(case((selected, 1), else_=0)).label("selected"),
+        )
+        .where(*_conditions(f, today, skip=("date", "genre")))
+        .group_by(db.func.lower(Event.genre))
+    ).all()
+
+
+def facet_counts(f: Browse, today: date | None = None) -> dict:
+    """How many events each genre (keyed lower-case) and each date window would show.
+
+    Each facet ignores its own dimension: genre counts use the selected date
+    window, window counts use the selected genre, both use price and status.
+    Cached until the next event write (see cache.invalidate_events).
+    """
+    today = today or date.today()
+
+    def compute():
+        rows = _facet_rows(f, today)
+        genre_key = f.genre.lower() if f.genre else None
+        in_genre = [r for r in rows if genre_key is None or r.key == genre_key]
+        return {
+            "genres": {r.key or "": int(r.selected or 0) for r in rows if r.selected},
+            "dates": {w: sum(int(getattr(r, w) or 0) for r in in_genre) for w in FACET_WINDOWS},
+            "total": sum(int(r.selected or 0) for r in in_genre),
+        }
+
+    return cached_json(f"facets:{today.isoformat()}:{f.key()}", compute)
@@ -0,0 +1,440 @@
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dtime
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.orm import aliased
+from werkzeug.datastructures import MultiDict
+
+from . import db
+from .forms import EventImportForm
+from .models import Event, Order, User
+
+
+DEFAULT_IMAGE = '/static/image/default_event.jpg'
+MAX_REPORTED_ERRORS = 50  # keep memory flat however many rows are rejected
+
+
+# -------------------------------------
+# Streaming readers / writers
+# -------------------------------------
+def detect_format(filename: str, fmt: str | None = None) -> str:
+    fmt = fmt or ("jsonl" if filename.endswith((".jsonl", ".ndjson")) else "csv")
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported format {fmt!r} (use csv or jsonl)")
+    return fmt
+
+
+def read_records(fp, fmt: str):
+    """Yield (line number, record dict or None, error) one row at a time."""
+    if fmt == "csv":
+        for line_no, record in _csv_records(fp):
+            yield line_no, record, None
+        return
+    for line_no, line in enumerate(fp, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, None, f"invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _csv_records(fp):
+    # DictReader does not expose its reader's line number, so track it here
+    reader = csv.reader(fp)
+    header = next(reader, None) or []
+    for row in reader:
+        yield reader.line_num, dict(zip(header, row))
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class RecordWriter:
+    """Write dict rows as CSV or JSONL to an open text stream."""
+
+    def __init__(self, fp, fmt: str, columns):
+        self.fp = fp
+        self.fmt = fmt
+        self.columns = columns
+        if fmt == "csv":
+            self._csv = csv.DictWriter(fp, fieldnames=columns)
+            self._csv.writeheader()
+
+    def write(self, row: dict):
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+        else:
+            self.fp.write(json.dumps({k: _plain(row[k]) for k in self.columns}) + "\n")
+
+
+# -------------------------------------
+# Import
+# -------------------------------------
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    kind: str
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)  # (line, message), first MAX_REPORTED_ERRORS only
+    started: float = field(default_factory=time.perf_counter)
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _truthy(value) -> bool:
+    return _text(value).lower() in ("1", "true", "yes", "y", "on")
+
+
+def _form_errors(form) -> str:
+    return "; ".join(f"{name}: {', '.join(errs)}" for name, errs in form.errors.items())
+
+
+EVENT_STATUSES = ("Open", "Sold Out", "Cancelled", "Inactive")
+
+
+def _event_row(record: dict, scratch: dict) -> dict:
+    """Validate one event record with the EventImportForm rules and map it to column values.
+
+    One form per chunk is re-bound to each record (form.process), which is
+    about twice as fast as building a new form per row.
+    """
+    data = {
+        name: _text(record.get(name))
+        for name in ("title", "date", "venue", "genre", "start_time", "door_time", "price", "quantity", "description")
+    }
+    # the form's TimeFields only take HH:MM; exports from this app write the same
+    for name in ("start_time", "door_time"):
+        data[name] = data[name][:5]
+    if _truthy(record.get("featuredevent")):
+        data["featuredevent"] = "y"
+
+    # keep the exported status, so a Cancelled event never comes back bookable
+    status = _text(record.get("status")) or "Open"
+    if status not in EVENT_STATUSES:
+        raise RowError(f"status: must be one of {', '.join(EVENT_STATUSES)}")
+
+    form = scratch.get("form")
+    if form is None:
+        form = scratch["form"] = EventImportForm(formdata=None, meta={"csrf": False})
+    form.process(MultiDict(data))
+    if not form.validate():
+        raise RowError(_form_errors(form))
+    return {
+        "title": form.title.data,
+        "genre": form.genre.data,
+        "venue": form.venue.data,
+        "date": form.date.data,
+        "start_time": form.start_time.data,
+        "door_time": form.door_time.data,
+        "price": float(form.price.data),
+        "quantity": form.quantity.data,
+        "description": form.description.data,
+        "featuredevent": form.featuredevent.data,
+        "status": status,
+        "image": _text(record.get("image"))[:400] or DEFAULT_IMAGE,
+        "_email": _text(record.get("creator_email")) or None,
+    }
+
+
+def _user_row(record: dict, _scratch: dict) -> dict:
+    row = {
+        name: _text(record.get(name))
+        for name in ("first_name", "last_name", "email", "contact_number", "street_address", "password_hash")
+    }
+    missing = [name for name in ("first_name", "last_name", "email", "password_hash") if not row[name]]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+    if "@" not in row["email"]:
+        raise RowError("email: not an email address")
+    return row
+
+
+# an order names its event by these exported columns, not by the event's id:
+# ids are reassigned when events are imported into another database
+EVENT_KEY = ("event_creator_email", "event_title", "event_date", "event_start_time", "event_venue")
+ORDER_STATUSES = ("Paid", "Refunded")
+
+
+def _event_key(creator_email, title, event_date, start_time, venue) -> tuple:
+    return (creator_email.lower(), title, event_date, start_time.replace(second=0, microsecond=0), venue)
+
+
+def _order_row(record: dict, _scratch: dict) -> dict:
+    missing = [name for name in EVENT_KEY if not _text(record.get(name))]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+    try:
+        quantity = int(_text(record.get("quantity")))
+        event_key = _event_key(
+            _text(record.get("event_creator_email")),
+            _text(record.get("event_title")),
+            date.fromisoformat(_text(record.get("event_date"))),
+            dtime.fromisoformat(_text(record.get("event_start_time"))[:5]),
+            _text(record.get("event_venue")),
+        )
+        total = _text(record.get("total_price"))
+        placed = _text(record.get("order_date"))
+        refunded = _text(record.get("refunded_at"))
+        row = {
+            "_event": event_key,
+            "quantity": quantity,
+            "total_price": float(total) if total else None,
+            "order_date": datetime.fromisoformat(placed) if placed else datetime.now(),
+            "status": _text(record.get("status")) or "Paid",
+            "refunded_at": datetime.fromisoformat(refunded) if refunded else None,
+            "_email": _text(record.get("user_email")),
+        }
+    except ValueError as exc:
+        raise RowError(str(exc)) from exc
+    if quantity < 1:
+        raise RowError("quantity: must be at least 1")
+    if row["status"] not in ORDER_STATUSES:
+        raise RowError(f"status: must be one of {', '.join(ORDER_STATUSES)}")
+    if not row["_email"]:
+        raise RowError("missing user_email")
+    return row
+
+
+def _user_ids(emails) -> dict:
+    """Map lower-cased email -> user id for the given emails, using the users.email index."""
+    emails = {e for e in emails if e}
+    if not emails:
+        return {}
+    rows = db.session.execute(
+        db.select(User.email, User.id).where(User.email.in_(emails | {e.lower() for e in emails}))
+    ).all()
+    return {email.lower(): user_id for email, user_id in rows}
+
+
+def _resolve_events(rows, default_creator_id, stats):
+    ids = _user_ids(r["_email"] for r, _ in rows)
+    resolved = []
+    for row, line in rows:
+        email = row.pop("_email")
+        creator_id = ids.get(email.lower()) if email else default_creator_id
+        if creator_id is None:
+            stats.reject(line, f"unknown creator {email or '(none given)'}")
+            continue
+        row["creator_id"] = creator_id
+        resolved.append(row)
+    return resolved
+
+
+def _resolve_users(rows, _default, stats):
+    taken = set(_user_ids(r["email"] for r, _ in rows))
+    resolved = []
+    for row, line in rows:
+        if row["email"].lower() in taken:
+            stats.reject(line, f"email {row['email']} already exists")
+            continue
+        taken.add(row["email"].lower())
+        resolved.append(row)
+    return resolved
+
+
+def _event_ids(keys) -> dict:
+    """Map event key -> [(id, price)] for the given keys, one query per chunk."""
+    keys = set(keys)
+    found = {}
+    for row in db.session.execute(
+        db.select(User.email, Event.title, Event.date, Event.start_time, Event.venue, Event.id, Event.price)
+        .join(User, User.id == Event.creator_id)
+        .where(Event.title.in_({k[1] for k in keys}), Event.date.in_({k[2] for k in keys}))
+    ):
+        key = _event_key(row.email, row.title, row.date, row.start_time, row.venue)
+        if key in keys:
+            found.setdefault(key, []).append((row.id, row.price))
+    return found
+
+
+def _resolve_orders(rows, _default, stats):
+    users = _user_ids(r["_email"] for r, _ in rows)
+    events = _event_ids(r["_event"] for r, _ in rows)
+    resolved = []
+    for row, line in rows:
+        email = row.pop("_email")
+        key = row.pop("_event")
+        if email.lower() not in users:
+            stats.reject(line, f"unknown user {email}")
+            continue
+        matches = events.get(key, [])
+        if len(matches) != 1:
+            problem = "no such event" if not matches else f"{len(matches)} events match"
+            stats.reject(line, f"{problem}: {key[1]!r} on {key[2]} by {key[0]}")
+            continue
+        event_id, price = matches[0]
+        row["event_id"] = event_id
+        row["user_id"] = users[email.lower()]
+        if row["total_price"] is None:
+            row["total_price"] = float(price) * row["quantity"]
+        resolved.append(row)
+    return resolved
+
+
+IMPORTERS = {
+    "events": (Event, _event_row, _resolve_events),
+    "users": (User, _user_row, _resolve_users),
+    "orders": (Order, _order_row, _resolve_orders),
+}
+
+
+def import_records(records, kind: str, batch_size: int = 1000, default_creator_email: str | None = None,
+                   progress=None) -> ImportStats:
+    """Validate and insert records in chunks of `batch_size`, one executemany INSERT per chunk.
+
+    `records` yields (line, record, error) as read_records() does, so the
+    whole file is never held in memory. Invalid rows are counted and
+    skipped, not fatal. `progress(stats)` is called after every chunk.
+    """
+    model, validate, resolve = IMPORTERS[kind]
+    stats = ImportStats(kind)
+    default_creator_id = None
+    if default_creator_email:
+        default_creator_id = _user_ids([default_creator_email]).get(default_creator_email.lower())
+        if default_creator_id is None:
+            raise ValueError(f"No user with email {default_creator_email}")
+
+    def flush(chunk):
+        rows = resolve(chunk, default_creator_id, stats)
+        if rows:
+            db.session.execute(insert(model), rows)
+            db.session.commit()
+            stats.imported += len(rows)
+        if progress:
+            progress(stats)
+
+    chunk = []
+    # EventForm needs a request context (CSRF meta, flash); a fresh one per
+    # chunk keeps the flashed-message list from growing with the file
+    ctx, scratch = current_app.test_request_context(), {}
+    ctx.push()
+    try:
+        for line, record, error in records:
+            stats.read += 1
+            if error is None:
+                try:
+                    chunk.append((validate(record, scratch), line))
+                except RowError as exc:
+                    error = str(exc)
+            if error is not None:
+                stats.reject(line, error)
+            if len(chunk) >= batch_size:
+                flush(chunk)
+                chunk = []
+                ctx.pop()
+                ctx, scratch = current_app.test_request_context(), {}
+                ctx.push()
+        if chunk:
+            flush(chunk)
+    finally:
+        ctx.pop()
+    return stats
+
+
+def after_import(kind: str):
+    """Bring derived data back in line after rows were inserted behind the ORM's back."""
+    from .cache import invalidate_events
+    from .counters import reconcile_counters
+    from .maintenance import refresh_event_statuses
+    from .search import rebuild_index
+
+    if kind == "events":
+        # full: imported past events sit behind the incremental watermark
+        refresh_event_statuses(full=True)
+        rebuild_index()
+        invalidate_events()
+    elif kind == "orders":
+        reconcile_counters()
+        invalidate_events()
+
+
+# -------------------------------------
+# Export
+# -------------------------------------
+def _export_orders_query():
+    creator = aliased(User)
+    return (
+        db.select(
+            creator.email.label("event_creator_email"), Event.title.label("event_title"),
+            Event.date.label("event_date"), Event.start_time.label("event_start_time"),
+            Event.venue.label("event_venue"), User.email.label("user_email"), Order.quantity,
+            Order.total_price, Order.order_date, Order.status, Order.refunded_at,
+        )
+        .join(User, User.id == Order.user_id)
+        .join(Event, Event.id == Order.event_id)
+        .join(creator, creator.id == Event.creator_id)
+        .order_by(Order.id)
+    )
+
+
+EXPORTS = {
+    "events": (
+        ["title", "genre", "venue", "date", "start_time", "door_time", "price", "quantity",
+         "description", "image", "featuredevent", "status", "creator_email"],
+        lambda: db.select(
+            Event.title, Event.genre, Event.venue, Event.date, Event.start_time, Event.door_time,
+            Event.price, Event.quantity, Event.description, Event.image, Event.featuredevent,
+            Event.status, User.email.label("creator_email"),
+        ).join(User, User.id == Event.creator_id).order_by(Event.id),
+    ),
+    "users": (
+        ["first_name", "last_name", "email", "contact_number", "street_address", "password_hash"],
+        lambda: db.select(
+            User.first_name, User.last_name, User.email, User.contact_number,
+            User.street_address, User.password_hash,
+        ).order_by(User.id),
+    ),
+    "orders": (
+        [*EVENT_KEY, "user_email", "quantity", "total_price", "order_date", "status", "refunded_at"],
+        _export_orders_query,
+    ),
+}
+
+
+def export_records(fp, kind: str, fmt: str, batch_size: int = 1000) -> int:
+    """Stream a table out as CSV or JSONL, fetching `batch_size` rows at a time."""
+    columns, query = EXPORTS[kind]
+    writer = RecordWriter(fp, fmt, columns)
+    written = 0
+    result = db.session.execute(query().execution_options(yield_per=batch_size))
+    for row in result.mappings():
+        row = dict(row)
+        for name in ("start_time", "door_time", "event_start_time"):
+            if row.get(name) is not None:
+                row[name] = row[name].strftime("%H:%M")
+        writer.write(row)
+        written += 1
+    return written
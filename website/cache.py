@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+
+# -------------------------------------
+# In-process LRU cache with TTL
+# -------------------------------------
+class LRUCache:
+    """Bounded, thread-safe LRU cache where every entry also expires after `ttl` seconds."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump_generation(self):
+        # old keys are simply never asked for again and age out of the LRU
+        with self._lock:
+            self._generation += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# -------------------------------------
+# Redis-compatible backend (optional)
+# -------------------------------------
+class RedisCache:
+    """Same interface as LRUCache, backed by any Redis-protocol server.
+
+    Entries and the generation counter live on the server, so every worker
+    process shares them; eviction is left to the server's maxmemory policy.
+    """
+
+    GENERATION_KEY = "cache:generation"
+
+    def __init__(self, url: str, ttl: float = 60, prefix: str = "eventfinder:"):
+        import redis  # optional dependency, only needed for CACHE_BACKEND = 'redis'
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode()
+
+    def set(self, key, value):
+        self._client.set(self.prefix + key, value, ex=int(self.ttl))
+
+    def generation(self) -> int:
+        return int(self._client.get(self.prefix + self.GENERATION_KEY) or 0)
+
+    def bump_generation(self):
+        self._client.incr(self.prefix + self.GENERATION_KEY)
+
+    def stats(self) -> dict:
+        info = self._client.info("stats")
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": info.get("evicted_keys", 0),
+            "expirations": info.get("expired_keys", 0),
+        }
+
+
+class NullCache:
+    """Caching switched off (CACHE_BACKEND = 'none')."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def generation(self) -> int:
+        return 0
+
+    def bump_generation(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none"}
+
+
+# -----------------------------
+# App wiring
+# -----------------------------
+def init_cache(app):
+    backend = app.config["CACHE_BACKEND"]
+    if backend == "redis":
+        cache = RedisCache(app.config["CACHE_REDIS_URL"], ttl=app.config["CACHE_TTL"])
+    elif backend == "memory":
+        cache = LRUCache(app.config["CACHE_MAX_ENTRIES"], ttl=app.config["CACHE_TTL"])
+    else:
+        cache = NullCache()
+    app.extensions["cache"] = cache
+
+
+def get_cache():
+    return current_app.extensions["cache"]
+
+
+def cached_fragment(key: str, render) -> Markup:
+    """Return rendered HTML for `key`, calling render() only on a miss.
+
+    Keys are scoped to the current event generation, so invalidate_events()
+    drops every event-derived fragment at once.
+    """
+    cache = get_cache()
+    scoped_key = f"events:{cache.generation()}:{key}"
+    html = cache.get(scoped_key)
+    if html is None:
+        html = str(render())
+        cache.set(scoped_key, html)
+    return Markup(html)
+
+
+def cached_json(key: str, compute):
+    """Like cached_fragment, for JSON-serialisable data instead of HTML."""
+    cache = get_cache()
+    scoped_key = f"events:{cache.generation()}:{key}"
+    raw = cache.get(scoped_key)
+    if raw is None:
+        value = compute()
+        cache.set(scoped_key, json.dumps(value))
+        return value
+    return json.loads(raw)
+
+
+def invalidate_events():
+    """Call after any write that changes what event listings show."""
+    get_cache().bump_generation()
@@ -0,0 +1,190 @@
+import click
+
+
+# ---- CLI Commands ----
+def register_commands(app):
+    @app.cli.command("sweep-holds")
+    def sweep_holds():
+        """Return tickets from expired holds to their events."""
+        from .holds import sweep_expired_holds
+        click.echo(f"Expired {sweep_expired_holds()} holds")
+
+    @app.cli.command("refresh-statuses")
+    @click.option("--full", is_flag=True, help="Rescan every event instead of starting from the last run.")
+    def refresh_statuses(full):
+        """Move past events to Inactive and sync Sold Out / Open with ticket counts."""
+        from .maintenance import refresh_event_statuses
+        state = refresh_event_statuses(full=full)
+        click.echo(f"Updated {state.rows_touched} events in {state.duration_ms:.1f} ms")
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Create the database or apply any pending schema migrations."""
+        from .migrations import upgrade
+        ran = upgrade()
+        click.echo(f"Applied migrations: {ran}" if ran else "Database is up to date")
+
+    @app.cli.command("check-query-plans")
+    def check_query_plans():
+        """Fail if any listing query falls back to a full table scan."""
+        from .query_plans import full_scans, listing_queries, explain, pattern_errors
+        misread = pattern_errors()
+        if misread:
+            raise click.ClickException(f"Full-scan pattern misreads: {'; '.join(misread)}")
+        problems = full_scans()
+        for name, query in listing_queries().items():
+            status = "SCAN" if name in problems else "ok"
+            click.echo(f"[{status}] {name}: {' | '.join(explain(query))}")
+        if problems:
+            raise click.ClickException(f"Full table scans in: {', '.join(problems)}")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """Rebuild the event search index from the events table."""
+        from .search import get_index, rebuild_index
+        rebuild_index()
+        click.echo(f"Rebuilt {get_index().name} search index")
+
+    @app.cli.command("backfill-images")
+    @click.option("--batch-size", default=50, show_default=True)
+    def backfill_images(batch_size):
+        """Move existing event images into the content store and build their resized variants."""
+        from .images import backfill_event_images
+        done = backfill_event_images(batch_size)
+        click.echo(f"Processed {done} event images")
+
+    @app.cli.command("reconcile-counters")
+    @click.option("--dry-run", is_flag=True, help="Only report drift, do not correct it.")
+    def reconcile_counters_command(dry_run):
+        """Recount tickets sold, revenue and comments per event and fix any drift."""
+        from .counters import reconcile_counters
+        drift = reconcile_counters(fix=not dry_run)
+        for d in drift:
+            click.echo(f"event {d.event_id}: {d.field} stored {d.stored}, actual {d.actual}")
+        if not drift:
+            click.echo("All event counters match")
+        elif dry_run:
+            raise click.ClickException(f"{len(drift)} counters drifted")
+        else:
+            click.echo(f"Corrected {len(drift)} counters")
+
+    @app.cli.command("rollup-sales")
+    def rollup_sales_command():
+        """Fold new orders into the hourly and daily sales rollups."""
+        from .analytics import rollup_sales
+        state = rollup_sales()
+        click.echo(f"Rolled up {state.rows_touched} orders (watermark: order {state.watermark})")
+
+    @app.cli.command("refund-event")
+    @click.argument("event_id", type=int)
+    @click.option("--batch-size", type=int, help="Orders per transaction. Defaults to REFUND_BATCH.")
+    def refund_event(event_id, batch_size):
+        """Refund the orders of a cancelled event now instead of waiting for the job worker."""
+        from .refunds import refund_event_orders
+
+        def report(rows, batch_ms, total):
+            click.echo(f"  {rows:,} orders in {batch_ms:.1f} ms ({total:,} so far)", err=True)
+
+        try:
+            state = refund_event_orders(event_id, batch_size, progress=report)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f"Refunded {state.rows_touched:,} orders of event {event_id} (last order {state.watermark})")
+
+    @app.cli.command("run-schedulers")
+    def run_schedulers():
+        """Run the hold sweeper, status refresh and sales rollup until interrupted. Run one of these."""
+        from .scheduler import start_schedulers
+        threads = start_schedulers(app)
+        click.echo(f"Running {', '.join(t.name for t in threads) or 'nothing (every interval is 0)'}")
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            pass
+
+    @app.cli.command("jobs-worker")
+    @click.option("--threads", type=int, help="Jobs run at once. Defaults to JOB_WORKER_THREADS.")
+    @click.option("--once", is_flag=True, help="Exit when nothing is due instead of polling.")
+    def jobs_worker(threads, once):
+        """Run queued background jobs (emails and other deferred work)."""
+        from .jobs import Worker
+        worker = Worker(app, threads)
+        click.echo(f"Worker {worker.worker_id} running {worker.threads} threads")
+        try:
+            worker.run(once=once)
+        except KeyboardInterrupt:
+            worker.stop()
+        counts = worker.counts
+        click.echo(f"{counts['done']} done, {counts['queued']} to retry, {counts['failed']} failed")
+
+    @app.cli.command("jobs-status")
+    def jobs_status():
+        """Show how many jobs are queued, running, done and failed."""
+        from .jobs import queue_stats
+        for name, value in queue_stats().items():
+            click.echo(f"{name}: {value}")
+
+    @app.cli.command("jobs-purge")
+    @click.option("--older-than-days", default=7, show_default=True)
+    def jobs_purge(older_than_days):
+        """Delete finished jobs. Failed ones are kept."""
+        from .jobs import purge_finished
+        click.echo(f"Deleted {purge_finished(older_than_days)} finished jobs")
+
+    @app.cli.command("smtp-sink")
+    @click.option("--port", type=int, help="Defaults to MAIL_PORT.")
+    def smtp_sink(port):
+        """Accept mail on localhost and print it instead of delivering it (for MAIL_BACKEND='smtp' in development)."""
+        from .mailer import SMTPSink
+
+        def show(sender, recipients, message):
+            click.echo(f"--- {sender} -> {', '.join(recipients)}\n{message}")
+
+        sink = SMTPSink(("127.0.0.1", port or app.config['MAIL_PORT']), on_message=show)
+        click.echo(f"Listening on {sink.server_address[0]}:{sink.server_address[1]}")
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            sink.server_close()
+
+    @app.cli.command("import-data")
+    @click.argument("kind", type=click.Choice(["events", "users", "orders"]))
+    @click.argument("source", type=click.File("r", encoding="utf-8"))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Defaults from the file extension.")
+    @click.option("--batch-size", default=1000, show_default=True, help="Rows per INSERT.")
+    @click.option("--creator", help="Email of the creator for event rows without creator_email.")
+    def import_data(kind, source, fmt, batch_size, creator):
+        """Bulk-load events, users or orders from a CSV or JSONL file ('-' for stdin)."""
+        from .bulk import after_import, detect_format, import_records, read_records
+
+        def report(stats):
+            click.echo(
+                f"  {stats.read:,} read, {stats.imported:,} imported, {stats.rejected:,} rejected"
+                f" ({stats.rate:,.0f} rows/s)",
+                err=True,
+            )
+
+        fmt = detect_format(source.name, fmt)
+        try:
+            stats = import_records(read_records(source, fmt), kind, batch_size, creator, progress=report)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        after_import(kind)
+
+        for line, message in stats.errors:
+            click.echo(f"line {line}: {message}", err=True)
+        if stats.rejected > len(stats.errors):
+            click.echo(f"... and {stats.rejected - len(stats.errors):,} more rejected rows", err=True)
+        click.echo(f"Imported {stats.imported:,} {kind} in {stats.elapsed:.1f}s ({stats.rejected:,} rejected)")
+
+    @app.cli.command("export-data")
+    @click.argument("kind", type=click.Choice(["events", "users", "orders"]))
+    @click.argument("target", type=click.File("w", encoding="utf-8", lazy=True), default="-")
+    @click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Defaults from the file extension.")
+    @click.option("--batch-size", default=1000, show_default=True, help="Rows fetched per round trip.")
+    def export_data(kind, target, fmt, batch_size):
+        """Stream events, users (including password hashes) or orders to CSV or JSONL."""
+        from .bulk import detect_format, export_records
+        written = export_records(target, kind, detect_format(target.name, fmt), batch_size)
+        click.echo(f"Exported {written:,} {kind}", err=True)
@@ -0,0 +1,72 @@
+import hashlib
+import time
+from datetime import date, timezone
+
+from flask import make_response, request, session
+from flask_login import current_user
+
+from . import db
+from .models import Event
+
+
+# -------------------------------------
+# HTTP validators (ETag / Last-Modified)
+# -------------------------------------
+def make_etag(*parts) -> str:
+    """Build an ETag from the values a response depends on.
+
+    The viewer is always part of it, because the navbar and forms depend on
+    who is logged in. Logged-in pages also roll over hourly so a revalidated
+    page never keeps an expired CSRF token.
+    """
+    viewer = current_user.get_id() if current_user.is_authenticated else "anon"
+    if current_user.is_authenticated:
+        parts += (int(time.time() // 3600),)
+    raw = "|".join(str(p) for p in (*parts, viewer))
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _as_utc(value):
+    # naive datetimes in the DB are local time
+    return value.astimezone(timezone.utc).replace(microsecond=0) if value else None
+
+
+def not_modified(etag: str, last_modified=None):
+    """Return a 304 response if the client's copy is still current, else None.
+
+    Call this before loading or rendering anything expensive. A pending
+    flash message always forces a full response so it gets shown.
+    """
+    if session.get("_flashes"):
+        return None
+
+    fresh = False
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif last_modified is not None and request.if_modified_since:
+        fresh = _as_utc(last_modified) <= request.if_modified_since
+
+    if not fresh:
+        return None
+    return with_validators(make_response("", 304), etag, last_modified)
+
+
+def with_validators(response, etag: str, last_modified=None):
+    """Attach the ETag / Last-Modified and ask browsers to revalidate every time."""
+    response = make_response(response)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+    return response
+
+
+def listing_validators(*parts):
+    """ETag and Last-Modified for an event listing, from max(events.updated_at).
+
+    Today's date is included because the date filters move at midnight.
+    """
+    last_modified = db.session.scalar(db.select(db.func.max(Event.updated_at)))
+    return make_etag("listing", *parts, date.today(), last_modified), last_modified
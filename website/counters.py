@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+
+from sqlalchemy import bindparam, update
+
+from . import db
+from .models import Comment, Event, Order
+
+
+# -------------------------------------
+# Incremental maintenance
+# -------------------------------------
+def sale_values(quantity: int) -> dict:
+    """Counter updates for selling `quantity` tickets, for use in an UPDATE on events."""
+    return {
+        "tickets_sold": Event.tickets_sold + quantity,
+        "revenue": Event.revenue + Event.price * quantity,
+    }
+
+
+def record_sale(event_id, quantity: int):
+    """Add a confirmed sale to the event's counters. Does not commit."""
+    db.session.execute(
+        update(Event.__table__).where(Event.id == event_id).values(**sale_values(quantity))
+    )
+
+
+def record_comment(event_id):
+    """Count a new comment on the event. Does not commit."""
+    db.session.execute(
+        update(Event.__table__)
+        .where(Event.id == event_id)
+        .values(comment_count=Event.comment_count + 1)
+    )
+
+
+# -------------------------------------
+# Reconciliation
+# -------------------------------------
+@dataclass
+class Drift:
+    event_id: int
+    field: str
+    stored: float
+    actual: float
+
+
+def _actual_counters():
+    """Recount every event from orders and comments: one GROUP BY per table."""
+    sales = (
+        db.select(
+            Order.event_id,
+            db.func.sum(Order.quantity).label("sold"),
+            db.func.sum(Order.total_price).label("revenue"),
+        )
+        .group_by(Order.event_id)
+        .subquery()
+    )
+    comments = (
+        db.select(Comment.event_id, db.func.count().label("comments"))
+        .group_by(Comment.event_id)
+        .subquery()
+    )
+    return db.session.execute(
+        db.select(
+            Event.id,
+            Event.tickets_sold,
+            Event.revenue,
+            Event.comment_count,
+            db.func.coalesce(sales.c.sold, 0),
+            db.func.coalesce(sales.c.revenue, 0),
+            db.func.coalesce(comments.c.comments, 0),
+        )
+        .outerjoin(sales, sales.c.event_id == Event.id)
+        .outerjoin(comments, comments.c.event_id == Event.id)
+    ).all()
+
+
+def reconcile_counters(fix: bool = True) -> list[Drift]:
+    """Compare the stored counters with a full recount and (optionally) correct them.
+
+    Returns every mismatch found. Corrections go out as one executemany UPDATE.
+    """
+    drift, fixes = [], []
+    for event_id, sold, revenue, comment_count, actual_sold, actual_revenue, actual_comments in _actual_counters():
+        found = [
+            Drift(event_id, "tickets_sold", sold, actual_sold),
+            Drift(event_id, "revenue", revenue, round(actual_revenue, 2)),
+            Drift(event_id, "comment_count", comment_count, actual_comments),
+        ]
+        found = [d for d in found if round(d.stored or 0, 2) != round(d.actual, 2)]
+        if found:
+            drift.extend(found)
+            fixes.append({
+                "b_id": event_id,
+                "b_sold": actual_sold,
+                "b_revenue": round(actual_revenue, 2),
+                "b_comments": actual_comments,
+            })
+
+    if fix and fixes:
+        db.session.execute(
+            update(Event.__table__)
+            .where(Event.id == bindparam("b_id"))
+            .values(
+                tickets_sold=bindparam("b_sold"),
+                revenue=bindparam("b_revenue"),
+                comment_count=bindparam("b_comments"),
+            ),
+            fixes,
+        )
+        db.session.commit()
+    return drift
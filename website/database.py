@@ -0,0 +1,88 @@
+import os
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import make_url
+
+from . import db
+
+
+# -------------------------------------
+# Connection URL
+# -------------------------------------
+def database_url(default: str) -> str:
+    """The DATABASE_URL environment variable if set, else `default`.
+
+    Hosted Postgres providers still hand out 'postgres://' URLs, which
+    SQLAlchemy no longer accepts, so those are rewritten.
+    """
+    url = os.environ.get("DATABASE_URL") or default
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+# -------------------------------------
+# Engine options and SQLite pragmas
+# -------------------------------------
+def configure_engine_options(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings.
+
+    Must run before db.init_app(). Options set explicitly in
+    SQLALCHEMY_ENGINE_OPTIONS win. In-memory SQLite keeps SQLAlchemy's
+    single-connection pool, where pool sizing does not apply.
+    """
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    if url.get_backend_name() != "sqlite" or _is_file_sqlite(url):
+        options.setdefault("pool_size", app.config["DB_POOL_SIZE"])
+        options.setdefault("max_overflow", app.config["DB_MAX_OVERFLOW"])
+        options.setdefault("pool_timeout", app.config["DB_POOL_TIMEOUT"])
+        options.setdefault("pool_recycle", app.config["DB_POOL_RECYCLE"])
+        options.setdefault("pool_pre_ping", url.get_backend_name() != "sqlite")
+
+
+def sqlite_pragmas(config, read_only: bool = False) -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        # negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    # journal mode is a property of the file, so only the writer sets it
+    if config["SQLITE_JOURNAL_MODE"] and not read_only:
+        pragmas.insert(0, f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+    return pragmas
+
+
+def init_database(app):
+    """Apply the SQLite pragmas on every new connection of every SQLite engine."""
+    def pragma_listener(pragmas):
+        def apply_pragmas(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+        return apply_pragmas
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if _is_file_sqlite(engine.url):
+                read_only = engine.url.query.get("mode") == "ro"
+                sa_event.listen(engine, "connect", pragma_listener(sqlite_pragmas(app.config, read_only)))
+
+
+def describe(engine) -> dict:
+    """Settings actually in effect on one pooled connection (for the benchmark and admin)."""
+    info = {"backend": engine.url.get_backend_name(), "pool": engine.pool.status()}
+    if engine.url.get_backend_name() == "sqlite":
+        with engine.connect() as conn:
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size"):
+                info[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    return info
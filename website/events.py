@@ -1,42 +1,104 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from .models import Event, Comment, Order
+from flask import Blueprint, abort, current_app, render_template, request, redirect, url_for, flash
+from .models import Event, Comment, Order, TicketHold
 from flask_login import current_user, login_required
-from .forms import EventForm, CommentForm, PurchaseForm, EventUpdateForm
+from .forms import EventForm, CommentForm, PurchaseForm, EventUpdateForm, HoldForm
 from . import db
-import os
+from .reservations import purchase_tickets
+from .holds import place_hold, confirm_hold, release_hold
+from .browse import Browse, browse_page
+from .pagination import keyset_page, page_size
+from .readonly import read_only
+from .cache import cached_fragment, invalidate_events
+from .availability import availability_stream, publish_availability
+from .counters import record_comment
+from .notifications import queue_cancellation_notices
+from .refunds import queue_refunds
+from .conditional import make_etag, not_modified, with_validators, listing_validators
+from .images import process_in_background, sniff_image_type, store_original
+from datetime import date
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 
 events_bp = Blueprint('event', __name__, url_prefix='/events')
 
 
 @events_bp.route('/<id>')
+@read_only
 def show(id):
-    event = db.session.scalar(db.select(Event).where(Event.id == id))
+    comments_page = max(request.args.get('comments_page', 1, type=int), 1)
+
+    # one cheap query for the validators before loading the event or its comments
+    state = db.session.execute(
+        db.select(
+            Event.version,
+            Event.updated_at,
+            Event.comment_count,
+            db.select(db.func.max(Comment.updated_at)).where(Comment.event_id == Event.id).scalar_subquery(),
+        ).where(Event.id == id)
+    ).first()
+    if state is None:
+        abort(404)
+
+    version, updated_at, comment_count, comments_updated_at = state
+    etag = make_etag("event", id, version, comment_count, comments_updated_at, comments_page)
+    last_modified = max(filter(None, [updated_at, comments_updated_at]), default=None)
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+
+    # the creator is shown on the page, so join it in rather than lazy-loading
+    event = db.session.scalar(
+        db.select(Event).options(joinedload(Event.creator)).where(Event.id == id)
+    )
+
+    # one page of comments, each with its author joined in (Comment.user is lazy='joined')
+    per_page = current_app.config['COMMENTS_PAGE_SIZE']
+    comments = db.session.scalars(
+        event.comments.select()
+        .order_by(Comment.created_at, Comment.id)
+        .limit(per_page)
+        .offset((comments_page - 1) * per_page)
+    ).all()
+
     cform = CommentForm()
     oform = PurchaseForm()
-    return render_template('events/show.html', event=event, cform=cform, oform=oform)
+    page = render_template(
+        'events/show.html',
+        event=event,
+        comments=comments,
+        comments_page=comments_page,
+        has_more_comments=comments_page * per_page < comment_count,
+        cform=cform,
+        oform=oform,
+    )
+    return with_validators(page, etag, last_modified)
+
+
+@events_bp.route('/<int:id>/availability')
+@read_only
+def availability(id):
+    """Live ticket count and status for the event page (Server-Sent Events)."""
+    stream = availability_stream(id)
+    if stream is None:
+        abort(404)
+    return stream
 
 
 @events_bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
-    print('Method type:', request.method)
     form = EventForm()
 
     if request.method == 'POST':
-        print("📩 Form submitted")
-        print("Door time:", form.door_time.data, "| Start time:", form.start_time.data)
-
         # Check that start time is after door time
         
         if form.start_time.data and form.door_time.data:
             if form.start_time.data <= form.door_time.data:
                 flash("Start time must be after door time.", "danger")
-                print("❌ Flash triggered — start time is before or equal to door time.")
                 return render_template('events/create.html', form=form)
 
     if form.validate_on_submit():
-        db_file_path = check_upload_file(form)
+        db_file_path, image_hash = check_upload_file(form)
 
         event = Event(
             title=form.title.data,
@@ -49,39 +111,47 @@ def create():
             quantity=form.quantity.data,
             description=form.description.data,
             image=db_file_path or '/static/image/default_event.jpg',
+            image_hash=image_hash,
             featuredevent=form.featuredevent.data,
             creator=current_user
         )
 
         db.session.add(event)
         db.session.commit()
-        print(f"Event added with ID {event.id}")
+        if image_hash:
+            process_in_background(event.id, image_hash)
+        invalidate_events()
+        current_app.logger.info("Event added with ID %s", event.id)
         flash("Event created successfully!", "success")
         return redirect(url_for('event.show', id=event.id))
     else:
         if request.method == 'POST':
-            print('Validation failed:', form.errors)
+            current_app.logger.debug("Event form validation failed: %s", form.errors)
 
     return render_template('events/create.html', form=form)
 
 
 def check_upload_file(form):
-    """Safely handle optional file uploads and return the image path or None."""
-    fp = form.image.data
+    """Store an optional upload by content hash. Returns (image url, hash) or (None, None).
 
-    if not fp:
-        return None
+    The form has already checked the size and magic bytes (forms.ImageUpload);
+    the stored extension comes from the content, not the client's filename.
+    Resized variants are generated afterwards on the image worker pool,
+    see process_in_background().
+    """
+    fp = form.image.data
 
-    filename = secure_filename(fp.filename)
-    if not filename:
-        return None
+    if not fp or not secure_filename(fp.filename or ''):
+        return None, None
 
-    BASE_PATH = os.path.dirname(__file__)
-    upload_path = os.path.join(BASE_PATH, 'static', 'image', filename)
-    db_upload_path = '/static/image/' + filename
+    extension = sniff_image_type(fp.stream)
+    if extension is None:
+        return None, None
 
-    fp.save(upload_path)
-    return db_upload_path
+    digest, db_upload_path = store_original(
+        fp.stream, extension, max_bytes=current_app.config['MAX_IMAGE_BYTES']
+    )
+    return db_upload_path, digest
 
 
 @events_bp.route('/<id>/comment', methods=['POST'])
@@ -89,9 +159,10 @@ def check_upload_file(form):
 def comment(id):
     form = CommentForm()
     event = db.session.scalar(db.select(Event).where(Event.id == id))
-    if form.validate_on_submit():
+    if event and form.validate_on_submit():
         comment = Comment(text=form.text.data, event=event, user=current_user)
         db.session.add(comment)
+        record_comment(event.id)
         db.session.commit()
         flash('Your comment has been added', 'success')
     return redirect(url_for('event.show', id=id))
@@ -101,51 +172,105 @@ def comment(id):
 @login_required
 def purchase(id):
     form = PurchaseForm()
-    event = db.session.scalar(db.select(Event).where(Event.id == id))
 
     if form.validate_on_submit():
-        quantity_requested = int(request.form.get('quantity', 1))
+        quantity_requested = form.quantity.data
+        result = purchase_tickets(id, current_user.id, quantity_requested)
+
+        if result.status == "not_found":
+            flash("Event not found", "danger")
+            return redirect(url_for('main.index'))
+        if result.status == "closed":
+            flash(f"Event is not open for booking. Current status: {result.event_status}", "warning")
+        elif result.status == "sold_out":
+            flash("Sorry, ticket is sold out for this event.", "danger")
+        elif result.status == "insufficient":
+            flash(f"Only {result.remaining} tickets left.", "warning")
+        else:
+            if result.event_status == "Sold Out":
+                invalidate_events()  # cards show the Sold Out badge
+            publish_availability(id, result.remaining, result.event_status)
+            order = result.order
+            flash(f"Booking confirmed! Order ID #{order.id}. Total: ${order.total_price:.2f}", "success")
+    return redirect(url_for('event.show', id=id))
 
-        if event.status != "Open":
-            flash(f"Event is not open for booking. Current status: {event.status}", "warning")
-            return redirect(url_for('event.show', id=id))
-        if event.quantity <= 0:
+
+@events_bp.route('/<id>/hold', methods=['POST'])
+@login_required
+def hold(id):
+    form = PurchaseForm()
+
+    if form.validate_on_submit():
+        result = place_hold(id, current_user.id, form.quantity.data)
+
+        if result.status == "not_found":
+            flash("Event not found", "danger")
+            return redirect(url_for('main.index'))
+        if result.status == "closed":
+            flash(f"Event is not open for booking. Current status: {result.event_status}", "warning")
+        elif result.status == "sold_out":
             flash("Sorry, ticket is sold out for this event.", "danger")
-            return redirect(url_for('event.show', id=id))
-        if quantity_requested > event.quantity:
-            flash(f"Only {event.quantity} tickets left.", "warning")
-            return redirect(url_for('event.show', id=id))
-
-        order = Order(
-            user=current_user,
-            event=event,
-            quantity=quantity_requested,
-            order_date=db.func.now()
-        )
-        order.calculate_total()
+        elif result.status == "insufficient":
+            flash(f"Only {result.remaining} tickets left.", "warning")
+        else:
+            if result.event_status == "Sold Out":
+                invalidate_events()  # cards show the Sold Out badge
+            publish_availability(id, result.remaining, result.event_status)
+            return redirect(url_for('event.checkout', token=result.hold.token))
+    return redirect(url_for('event.show', id=id))
 
-        event.quantity -= quantity_requested
-        event.update_status()
 
-        db.session.add(order)
-        db.session.commit()
+@events_bp.route('/holds/<token>', methods=['GET', 'POST'])
+@login_required
+def checkout(token):
+    ticket_hold = db.session.scalar(
+        db.select(TicketHold).where(TicketHold.token == token, TicketHold.user_id == current_user.id)
+    )
+    if not ticket_hold:
+        flash("Booking hold not found", "danger")
+        return redirect(url_for('main.index'))
 
+    form = HoldForm()
+    if form.validate_on_submit():
+        event_id = ticket_hold.event_id
+        if form.release.data:
+            if release_hold(token, current_user.id):
+                invalidate_events()  # may re-open a Sold Out event
+                publish_availability(event_id)
+                flash("Your held tickets have been released.", "info")
+            else:
+                flash("This hold has already expired or been used.", "warning")
+            return redirect(url_for('event.show', id=event_id))
+
+        order = confirm_hold(token, current_user.id)
+        if order is None:
+            flash("This hold has expired. Please try booking again.", "warning")
+            return redirect(url_for('event.show', id=event_id))
         flash(f"Booking confirmed! Order ID #{order.id}. Total: ${order.total_price:.2f}", "success")
-    return redirect(url_for('event.show', id=id))
+        return redirect(url_for('event.show', id=event_id))
+
+    return render_template('events/hold.html', hold=ticket_hold, form=form)
 
 
 @events_bp.route('/books', methods=['GET'])
 @login_required
 def my_bookings():
-    orders = current_user.orders
+    # every booking card shows its event, so load them in the same query
+    orders = db.session.scalars(
+        db.select(Order)
+        .options(joinedload(Order.event))
+        .where(Order.user_id == current_user.id)
+        .order_by(Order.id)
+    ).all()
     return render_template('events/books.html', orders=orders)
 
 
 @events_bp.route('/my_events')
 @login_required
 def my_events():
-    events = Event.query.filter_by(creator_id=current_user.id).order_by(Event.date.desc()).all()
-    return render_template('events/my_events.html', events=events)
+    page = keyset_page(_creator_events_query(current_user.id), request.args.get('cursor'), descending=True)
+    next_url = url_for('event.my_events', cursor=page.next_cursor) if page.has_next else None
+    return render_template('events/my_events.html', events=page.items, next_url=next_url)
 
 
 @events_bp.route('/<id>/update', methods=['GET', 'POST'])
@@ -165,8 +290,9 @@ def update(id):
     form = EventUpdateForm()
 
     if form.validate_on_submit():
-        if form.image.data:
-            event.image = check_upload_file(form)
+        image_path, image_hash = check_upload_file(form)
+        if image_hash:
+            event.image, event.image_hash, event.image_variants = image_path, image_hash, None
 
         event.title = form.title.data
         event.venue = form.venue.data
@@ -180,6 +306,10 @@ def update(id):
         event.featuredevent = form.featuredevent.data
         event.update_status()
         db.session.commit()
+        if image_hash:
+            process_in_background(event.id, image_hash)
+        invalidate_events()
+        publish_availability(id)
         flash("Event updated successfully", "success")
         return redirect(url_for('event.show', id=event.id))
 
@@ -211,18 +341,59 @@ def cancel(id):
         return redirect(url_for('event.show', id=event.id))
 
     event.cancel()
+    # refunds and emails are run by the job worker; queued in the same transaction as the cancel
+    queue_refunds(id)
+    queue_cancellation_notices(id)
     db.session.commit()
+    invalidate_events()
+    publish_availability(id)
     flash("Event has been cancelled successfully.", "warning")
     return redirect(url_for('event.my_events'))
 
 
+def _creator_events_query(creator_id):
+    return Event.query.filter_by(creator_id=creator_id).order_by(Event.date.desc())
+
+
 @events_bp.route('/genre/<genre_name>')
+@read_only
 def genre_page(genre_name):
-    events = Event.query.filter(Event.genre.ilike(genre_name)).order_by(Event.date.asc()).all()
-    featured_events = Event.query.filter_by(featuredevent=True).limit(5).all()
-    return render_template(
+    # every date by default; ?filter=, price and status narrow it as on the home page
+    f = Browse.from_args(request.args, default_window="any", genre=genre_name)
+    cursor = request.args.get('cursor')
+    etag, last_modified = listing_validators(
+        "genre", f.key(), cursor, page_size(), request.args.get('fragment')
+    )
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+
+    # today's date: the date windows move at midnight
+    key = ":".join([
+        "genre", f.key(), date.today().isoformat(), cursor or "", str(page_size()),
+        "user" if current_user.is_authenticated else "anon",
+    ])
+
+    def render():
+        page, _ = browse_page(f, cursor)
+        if not page.items and not cursor:
+            return ""
+        # genre is in the path, not the query string
+        args = {k: v for k, v in f.args().items() if k != "genre"}
+        next_url = None
+        if page.has_next:
+            next_url = url_for('event.genre_page', genre_name=genre_name, **args, cursor=page.next_cursor, fragment=1)
+        return render_template('_event_cards.html', events=page.items, next_url=next_url)
+
+    cards_html = cached_fragment(key, render)
+
+    # infinite scroll asks for just the next batch of cards
+    if request.args.get('fragment'):
+        return with_validators(cards_html, etag, last_modified)
+
+    page = render_template(
         "events/genre.html",
         genre_name=genre_name,
-        events=events,
-        featured_events=featured_events
+        cards_html=cards_html,
     )
+    return with_validators(page, etag, last_modified)
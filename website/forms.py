@@ -1,6 +1,6 @@
 import re
 from datetime import date
-from flask import flash
+from flask import current_app, flash
 from flask_wtf import FlaskForm
 from wtforms import SelectField
 from wtforms.fields import (
@@ -15,6 +15,33 @@ from wtforms.widgets import TimeInput
 ALLOWED_FILE = {'PNG', 'JPG', 'JPEG', 'png', 'jpg', 'jpeg'}
 
 
+# -------------------
+# Upload validators
+# -------------------
+
+class ImageUpload:
+    """Check an uploaded image by its content, not its filename.
+
+    Rejects files over MAX_IMAGE_BYTES (measured on the spooled upload,
+    nothing is read) and files whose magic bytes are not PNG or JPEG.
+    """
+
+    def __init__(self, message='Only PNG and JPEG images are supported'):
+        self.message = message
+
+    def __call__(self, form, field):
+        from .images import sniff_image_type, stream_size
+
+        fp = field.data
+        if not fp:
+            return
+        limit = current_app.config['MAX_IMAGE_BYTES']
+        if stream_size(fp.stream) > limit:
+            raise ValidationError(f"Images must be under {limit // (1024 * 1024)} MB")
+        if sniff_image_type(fp.stream) is None:
+            raise ValidationError(self.message)
+
+
 # -------------------
 # Auth forms
 # -------------------
@@ -112,7 +139,8 @@ class EventForm(FlaskForm):
     featuredevent = BooleanField('Make this a featured event')
 
     image = FileField('Event Image', validators=[
-        FileAllowed(ALLOWED_FILE, message='Only supports png, jpg, JPG, PNG')
+        FileAllowed(ALLOWED_FILE, message='Only supports png, jpg, JPG, PNG'),
+        ImageUpload(),
     ])
 
     submit = SubmitField("Create")
@@ -129,6 +157,16 @@ class EventForm(FlaskForm):
             raise ValidationError("Event date cannot be in the past.")
 
 
+class EventImportForm(EventForm):
+    """EventForm rules for `flask import-data`: exported events may be past or sold out."""
+    quantity = IntegerField('Ticket Quantity', validators=[
+        InputRequired(), NumberRange(min=0, message="Quantity cannot be negative")
+    ])
+
+    def validate_date(self, field):
+        pass
+
+
 # -------------------
 # Other forms
 # -------------------
@@ -183,6 +221,12 @@ class EventUpdateForm(FlaskForm):
     description = TextAreaField('Description', validators=[InputRequired()])
     featuredevent = BooleanField('Make this a featured event')
     image = FileField('Event Image', validators=[
-        FileAllowed(ALLOWED_FILE, message='Only supports png, jpg, JPG, PNG')
+        FileAllowed(ALLOWED_FILE, message='Only supports png, jpg, JPG, PNG'),
+        ImageUpload(),
     ])
     submit = SubmitField("Update")
+
+
+class HoldForm(FlaskForm):
+    confirm = SubmitField('Confirm Booking')
+    release = SubmitField('Release Tickets')
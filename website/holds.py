@@ -0,0 +1,201 @@
+import secrets
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, case, update
+
+from . import db
+from .availability import publish_availability
+from .cache import invalidate_events
+from .counters import record_sale
+from .models import Event, Order, TicketHold
+from .notifications import queue_booking_confirmation
+from .reservations import ReservationResult, _explain_miss, _with_retries, take_tickets
+
+
+# -------------------------------------
+# Returning tickets to inventory
+# -------------------------------------
+def _return_tickets(event_id, quantity: int):
+    """Add `quantity` tickets back to an event with a single UPDATE.
+
+    Mirrors Event.update_status(): a Sold Out event re-opens once it has
+    tickets again, or becomes Inactive if its date has passed. Any other
+    status is left alone. A Cancelled event gets nothing back. Does not commit.
+    """
+    db.session.execute(
+        update(Event.__table__)
+        .where(Event.id == event_id, Event.status != "Cancelled")
+        .values(
+            quantity=Event.quantity + quantity,
+            status=case(
+                (and_(Event.status == "Sold Out", Event.date < date.today()), "Inactive"),
+                (Event.status == "Sold Out", "Open"),
+                else_=Event.status,
+            ),
+            version=Event.version + 1,
+            updated_at=datetime.now(),
+        )
+    )
+
+
+# -----------------------------
+# Hold / confirm / release
+# -----------------------------
+def place_hold(event_id, user_id, quantity: int, minutes: int | None = None) -> ReservationResult:
+    """Take tickets out of inventory and park them under a hold token for a few minutes."""
+    minutes = minutes or current_app.config.get("TICKET_HOLD_MINUTES", 10)
+
+    def attempt():
+        row = take_tickets(event_id, quantity)
+        if row is None:
+            return _explain_miss(event_id, quantity)
+
+        hold = TicketHold(
+            token=secrets.token_urlsafe(24),
+            event_id=event_id,
+            user_id=user_id,
+            quantity=quantity,
+            expires_at=datetime.now() + timedelta(minutes=minutes),
+        )
+        db.session.add(hold)
+        db.session.commit()
+        return ReservationResult(
+            "ok",
+            remaining=row.quantity,
+            event_status="Sold Out" if row.quantity <= 0 else "Open",
+            hold=hold,
+        )
+
+    return _with_retries(attempt)
+
+
+def _claim_hold(token: str, user_id, new_status: str):
+    """Move a live hold out of the Held state. Returns (id, event_id, quantity) or None."""
+    return db.session.execute(
+        update(TicketHold.__table__)
+        .where(
+            TicketHold.token == token,
+            TicketHold.user_id == user_id,
+            TicketHold.status == "Held",
+            TicketHold.expires_at > datetime.now(),
+        )
+        .values(status=new_status)
+        .returning(TicketHold.id, TicketHold.event_id, TicketHold.quantity)
+    ).first()
+
+
+def confirm_hold(token: str, user_id) -> Order | None:
+    """Turn a live hold into an Order. Returns None if the hold is gone or expired."""
+    def attempt():
+        row = _claim_hold(token, user_id, "Confirmed")
+        if row is None:
+            db.session.rollback()
+            return None
+
+        event = db.session.execute(
+            db.select(Event.price, Event.status).where(Event.id == row.event_id)
+        ).first()
+        if event.status == "Cancelled":
+            # the refund run may already have finished: never sell into a cancelled
+            # event, and release the hold so the sweeper does not restock it
+            db.session.execute(
+                update(TicketHold.__table__)
+                .where(TicketHold.id == row.id)
+                .values(status="Released")
+            )
+            db.session.commit()
+            return None
+        price = event.price
+        order = Order(
+            user_id=user_id,
+            event_id=row.event_id,
+            quantity=row.quantity,
+            total_price=float(price) * row.quantity,
+            order_date=datetime.now(),
+        )
+        db.session.add(order)
+        db.session.flush()
+        db.session.execute(
+            update(TicketHold.__table__)
+            .where(TicketHold.id == row.id)
+            .values(order_id=order.id)
+        )
+        record_sale(row.event_id, row.quantity)
+        queue_booking_confirmation(order)
+        db.session.commit()
+        return order
+
+    return _with_retries(attempt)
+
+
+def release_hold(token: str, user_id) -> bool:
+    """Give a held allocation back to the event before it expires."""
+    def attempt():
+        row = _claim_hold(token, user_id, "Released")
+        if row is None:
+            db.session.rollback()
+            return False
+
+        _return_tickets(row.event_id, row.quantity)
+        db.session.commit()
+        return True
+
+    return _with_retries(attempt)
+
+
+# -----------------------------
+# Expiry sweeper
+# -----------------------------
+def sweep_expired_holds(batch_size: int | None = None) -> int:
+    """Expire overdue holds in batches and return their tickets to inventory.
+
+    Each batch flips up to `batch_size` holds to Expired (only those still
+    Held, so a concurrent confirm wins) and restocks each affected event
+    with one UPDATE. Returns the number of holds expired.
+    """
+    batch_size = batch_size or current_app.config.get("HOLD_SWEEP_BATCH", 500)
+    expired = 0
+    restocked = set()
+
+    while True:
+        def sweep_batch():
+            now = datetime.now()
+            ids = db.session.scalars(
+                db.select(TicketHold.id)
+                .where(TicketHold.status == "Held", TicketHold.expires_at <= now)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                return 0, 0
+
+            rows = db.session.execute(
+                update(TicketHold.__table__)
+                .where(TicketHold.id.in_(ids), TicketHold.status == "Held")
+                .values(status="Expired")
+                .returning(TicketHold.event_id, TicketHold.quantity)
+            ).all()
+
+            per_event = defaultdict(int)
+            for event_id, quantity in rows:
+                per_event[event_id] += quantity
+            for event_id, quantity in per_event.items():
+                _return_tickets(event_id, quantity)
+
+            db.session.commit()
+            restocked.update(per_event)
+            # a confirm racing the sweep wins its hold: count only what was expired
+            return len(ids), len(rows)
+
+        picked, swept = _with_retries(sweep_batch)
+        expired += swept
+        if picked < batch_size:
+            break
+
+    if expired:
+        invalidate_events()
+        for event_id in restocked:
+            publish_availability(event_id)
+        current_app.logger.info("Expired %d ticket holds", expired)
+    return expired
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from PIL import Image, ImageOps
+from sqlalchemy import update
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from . import db
+from .cache import invalidate_events
+from .models import Event
+
+
+# variant name -> (width, height, crop to exactly that size?)
+VARIANTS = {
+    "thumb": (320, 180, True),
+    "card": (640, 360, True),
+    "hero": (1600, 900, False),
+}
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+CHUNK_SIZE = 64 * 1024
+
+# leading bytes of each accepted format -> extension the original is stored under
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+)
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    description = "The image is larger than the upload limit."
+
+
+# -------------------------------------
+# Upload checks
+# -------------------------------------
+def sniff_image_type(stream) -> str | None:
+    """Return the extension matching the stream's magic bytes, or None.
+
+    The stream is left at the position it started from.
+    """
+    start = stream.tell()
+    head = stream.read(16)
+    stream.seek(start)
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def stream_size(stream) -> int:
+    """Bytes left in a seekable upload stream, without reading it."""
+    start = stream.tell()
+    size = stream.seek(0, os.SEEK_END) - start
+    stream.seek(start)
+    return size
+
+
+# -------------------------------------
+# Content-addressed storage
+# -------------------------------------
+def _upload_dir(digest: str) -> str:
+    # two-level fan-out keeps any one directory small
+    return os.path.join(STATIC_DIR, "uploads", digest[:2], digest)
+
+
+def _static_url(path: str) -> str:
+    return "/static/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+
+def store_original(stream, extension: str, max_bytes: int | None = None) -> tuple[str, str]:
+    """Copy an upload into the content store, hashing it on the way through.
+
+    The copy goes chunk by chunk into a temp file that is renamed into place,
+    so a half-written original is never visible and memory use stays flat.
+    Raises UploadTooLarge (a 413) once more than `max_bytes` have been read.
+
+    Returns (digest, url of the stored original). Identical files land on
+    the same path, so re-uploading an image stores nothing new.
+    """
+    hasher = hashlib.sha256()
+    written = 0
+    os.makedirs(os.path.join(STATIC_DIR, "uploads"), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.join(STATIC_DIR, "uploads"), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := stream.read(CHUNK_SIZE):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadTooLarge()
+                hasher.update(chunk)
+                out.write(chunk)
+
+        digest = hasher.hexdigest()
+        folder = _upload_dir(digest)
+        os.makedirs(folder, exist_ok=True)
+        final_path = os.path.join(folder, f"original.{extension.lower()}")
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest, _static_url(final_path)
+
+
+def _original_path(digest: str) -> str | None:
+    folder = _upload_dir(digest)
+    for name in os.listdir(folder) if os.path.isdir(folder) else ():
+        if name.startswith("original."):
+            return os.path.join(folder, name)
+    return None
+
+
+# -------------------------------------
+# Variant generation
+# -------------------------------------
+def _save_atomically(img, path: str, pil_format: str, options: dict):
+    """Write to a temp file of our own, then rename it into place.
+
+    Two workers building the same image (say a re-upload racing a backfill)
+    each write their own temp file, so neither can rename the other's
+    half-written copy.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            img.save(out, pil_format, **options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def generate_variants(digest: str) -> dict:
+    """Decode the stored original once and write every size in WebP and JPEG.
+
+    Variants that already exist on disk (same content hash) are reused.
+    Returns {variant: {format: url}}.
+    """
+    folder = _upload_dir(digest)
+    wanted = {
+        (name, fmt): os.path.join(folder, f"{name}.{fmt}")
+        for name in VARIANTS for fmt in FORMATS
+    }
+
+    if not all(os.path.exists(path) for path in wanted.values()):
+        with Image.open(_original_path(digest)) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            for name, (width, height, crop) in VARIANTS.items():
+                if crop:
+                    resized = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+                else:
+                    resized = img.copy()
+                    resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+                for fmt, (pil_format, options) in FORMATS.items():
+                    path = wanted[(name, fmt)]
+                    if not os.path.exists(path):
+                        _save_atomically(resized, path, pil_format, options)
+
+    variants = {}
+    for (name, fmt), path in wanted.items():
+        variants.setdefault(name, {})[fmt] = _static_url(path)
+    return variants
+
+
+def process_event_image(event_id, digest: str):
+    """Generate variants for an event's image and record their paths on the event."""
+    variants = generate_variants(digest)
+    db.session.execute(
+        update(Event.__table__)
+        .where(Event.id == event_id, Event.image_hash == digest)
+        .values(
+            image_variants=json.dumps(variants),
+            version=Event.version + 1,
+            updated_at=datetime.now(),
+        )
+    )
+    db.session.commit()
+    invalidate_events()
+
+
+# -------------------------------------
+# Worker pool
+# -------------------------------------
+def init_images(app):
+    app.extensions["image_pool"] = ThreadPoolExecutor(
+        max_workers=app.config["IMAGE_WORKERS"], thread_name_prefix="images"
+    )
+
+
+def process_in_background(event_id, digest: str):
+    """Queue variant generation so the request can return straight away."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                process_event_image(event_id, digest)
+            except Exception:
+                app.logger.exception("Image processing failed for event %s", event_id)
+
+    return app.extensions["image_pool"].submit(run)
+
+
+# -------------------------------------
+# Backfill for images uploaded before the pipeline
+# -------------------------------------
+def backfill_event_images(batch_size: int = 50) -> int:
+    """Move existing static images into the content store and build their variants."""
+    done = 0
+    last_id = 0
+    while True:
+        events = db.session.scalars(
+            db.select(Event)
+            .where(Event.id > last_id, Event.image_variants.is_(None), Event.image.like("/static/%"))
+            .order_by(Event.id)
+            .limit(batch_size)
+        ).all()
+        if not events:
+            return done
+
+        for ev in events:
+            last_id = ev.id
+            source = os.path.join(STATIC_DIR, ev.image[len("/static/"):])
+            if not os.path.isfile(source):
+                continue
+            with open(source, "rb") as fp:
+                digest, url = store_original(fp, os.path.splitext(source)[1].lstrip(".") or "jpg")
+            ev.image, ev.image_hash = url, digest
+            ev.image_variants = json.dumps(generate_variants(digest))
+            done += 1
+        db.session.commit()
+        invalidate_events()
+
+
@@ -0,0 +1,225 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event as sa_event
+
+from . import db
+
+
+# -------------------------------------
+# SQL statement counting
+# -------------------------------------
+class QueryCounter:
+    """Records every SQL statement run on the engines while it is active."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count the SQL statements issued inside the block.
+
+        with count_queries() as counter:
+            client.get('/events/1')
+        assert counter.count <= 4, counter.statements
+
+    Without an `engine`, statements on every engine (primary and read-only) count.
+    """
+    engines = [engine] if engine is not None else list(db.engines.values())
+    counter = QueryCounter()
+    for e in engines:
+        sa_event.listen(e, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        for e in engines:
+            sa_event.remove(e, "before_cursor_execute", counter._record)
+
+
+@contextmanager
+def max_queries(limit: int, engine=None):
+    """Fail with AssertionError if the block runs more than `limit` SQL statements."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(counter.statements)
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
+
+
+# -------------------------------------
+# Per-request profiling and slow log
+# -------------------------------------
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+def _param_shape(parameters):
+    """Describe bound parameters by type only, so the slow log never holds user data."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return {"executemany": len(parameters), "row": _param_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.sql_statements = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS_MS)
+
+    def add(self, total_ms, sql_count, db_ms, template_ms):
+        self.count += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.sql_statements += sql_count
+        self.db_ms += db_ms
+        self.template_ms += template_ms
+        self.buckets[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, total_ms)] += 1
+
+    def as_dict(self) -> dict:
+        count = self.count or 1
+        return {
+            "requests": self.count,
+            "avg_ms": round(self.total_ms / count, 2),
+            "max_ms": round(self.max_ms, 2),
+            "avg_sql_statements": round(self.sql_statements / count, 2),
+            "avg_db_ms": round(self.db_ms / count, 2),
+            "avg_template_ms": round(self.template_ms / count, 2),
+            "latency_histogram_ms": [
+                {"le": "inf" if edge == float("inf") else edge, "count": n}
+                for edge, n in zip(HISTOGRAM_BUCKETS_MS, self.buckets)
+            ],
+        }
+
+
+class RequestProfiler:
+    """Times SQL, template rendering and the whole request for every request.
+
+    Requests slower than SLOW_REQUEST_MS, and single statements slower than
+    SLOW_QUERY_MS, are written as JSON lines to the slow log. Aggregates per
+    endpoint are kept in memory for the admin metrics page.
+    """
+
+    def __init__(self, app):
+        self.slow_request_ms = app.config["SLOW_REQUEST_MS"]
+        self.slow_query_ms = app.config["SLOW_QUERY_MS"]
+        self._stats = defaultdict(EndpointStats)
+        self._lock = threading.Lock()
+
+        self.log = logging.getLogger("website.slow")
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        if app.config["SLOW_LOG_PATH"] and not self.log.handlers:
+            os.makedirs(os.path.dirname(app.config["SLOW_LOG_PATH"]) or ".", exist_ok=True)
+            handler = RotatingFileHandler(app.config["SLOW_LOG_PATH"], maxBytes=1_000_000, backupCount=3)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.log.addHandler(handler)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._start_template, app)
+        template_rendered.connect(self._finish_template, app)
+        with app.app_context():
+            for engine in db.engines.values():
+                sa_event.listen(engine, "before_cursor_execute", self._start_query)
+                sa_event.listen(engine, "after_cursor_execute", self._finish_query)
+
+    # ---- SQL ----
+    def _start_query(self, conn, cursor, statement, parameters, context, executemany):
+        context._profiler_started = time.perf_counter()
+
+    def _finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context() or "profile" not in g:
+            return
+        elapsed_ms = (time.perf_counter() - context._profiler_started) * 1000
+        profile = g.profile
+        profile["sql_count"] += 1
+        profile["db_ms"] += elapsed_ms
+        if elapsed_ms >= self.slow_query_ms:
+            profile["slow_queries"].append({
+                "ms": round(elapsed_ms, 2),
+                "sql": statement,
+                "params": _param_shape(parameters),
+            })
+
+    # ---- templates ----
+    def _start_template(self, sender, template, context, **extra):
+        if "profile" in g:
+            g.profile["template_started"].append(time.perf_counter())
+
+    def _finish_template(self, sender, template, context, **extra):
+        if "profile" in g and g.profile["template_started"]:
+            started = g.profile["template_started"].pop()
+            # only count the outermost render so nested renders aren't added twice
+            if not g.profile["template_started"]:
+                g.profile["template_ms"] += (time.perf_counter() - started) * 1000
+
+    # ---- requests ----
+    def _start_request(self):
+        g.profile = {
+            "started": time.perf_counter(),
+            "sql_count": 0,
+            "db_ms": 0.0,
+            "template_ms": 0.0,
+            "template_started": [],
+            "slow_queries": [],
+        }
+
+    def _finish_request(self, response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+
+        total_ms = (time.perf_counter() - profile["started"]) * 1000
+        endpoint = request.endpoint or "unmatched"
+        with self._lock:
+            self._stats[endpoint].add(total_ms, profile["sql_count"], profile["db_ms"], profile["template_ms"])
+
+        if total_ms >= self.slow_request_ms or profile["slow_queries"]:
+            self.log.info(json.dumps({
+                "at": datetime.now().isoformat(timespec="seconds"),
+                "endpoint": endpoint,
+                "path": request.path,
+                "status": response.status_code,
+                "total_ms": round(total_ms, 2),
+                "sql_count": profile["sql_count"],
+                "db_ms": round(profile["db_ms"], 2),
+                "template_ms": round(profile["template_ms"], 2),
+                "slow_queries": profile["slow_queries"],
+            }))
+        return response
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def init_profiling(app):
+    app.extensions["profiler"] = RequestProfiler(app)
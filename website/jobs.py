@@ -0,0 +1,226 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, update
+
+from . import db
+from .models import Job
+
+# task name -> function(payload: dict), filled in by @task
+TASKS = {}
+
+
+def task(name: str):
+    """Register a function as a background task. It must be safe to run more than once."""
+    def register(fn):
+        TASKS[name] = fn
+        return fn
+    return register
+
+
+# -------------------------------------
+# Enqueueing
+# -------------------------------------
+def _insert_ignoring_duplicates():
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Job.__table__).on_conflict_do_nothing(index_elements=[Job.idempotency_key])
+
+
+def _job_row(task_name: str, payload: dict, key: str | None, run_at, max_attempts) -> dict:
+    if task_name not in TASKS:
+        raise KeyError(f"Unknown task {task_name!r}")
+    now = datetime.now()
+    return {
+        "task": task_name,
+        "payload": json.dumps(payload),
+        "idempotency_key": key,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts or current_app.config["JOB_MAX_ATTEMPTS"],
+        "run_at": run_at or now,
+        "created_at": now,
+    }
+
+
+def enqueue(task_name: str, payload: dict, key: str | None = None, run_at=None, max_attempts=None) -> bool:
+    """Queue a task in the current transaction. Does not commit.
+
+    Committing together with the write that caused it means the job exists
+    exactly when the write does. Returns False when a job with the same
+    idempotency `key` was already queued (it is left as it is).
+    """
+    row = _job_row(task_name, payload, key, run_at, max_attempts)
+    return db.session.execute(_insert_ignoring_duplicates(), [row]).rowcount != 0
+
+
+def enqueue_many(task_name: str, items) -> int:
+    """Queue one task per (payload, key) pair with a single executemany INSERT. Does not commit."""
+    rows = [_job_row(task_name, payload, key, None, None) for payload, key in items]
+    if not rows:
+        return 0
+    db.session.execute(_insert_ignoring_duplicates(), rows)
+    return len(rows)
+
+
+# -------------------------------------
+# Claiming and running
+# -------------------------------------
+def _claimable(now, stale_before):
+    # due queued jobs, plus running ones locked for longer than JOB_LOCK_TIMEOUT (their worker died)
+    return or_(
+        and_(Job.status == "queued", Job.run_at <= now),
+        and_(Job.status == "running", Job.locked_at < stale_before),
+    )
+
+
+def claim_jobs(limit: int, worker_id: str) -> list[int]:
+    """Atomically mark up to `limit` due jobs as running for this worker. Returns their ids.
+
+    The conditions are checked again in the UPDATE itself, so two workers
+    racing for the same rows can never both claim one.
+    """
+    now = datetime.now()
+    stale_before = now - timedelta(seconds=current_app.config["JOB_LOCK_TIMEOUT"])
+    due = (
+        db.select(Job.id)
+        .where(_claimable(now, stale_before))
+        .order_by(Job.run_at, Job.id)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    ids = db.session.scalars(
+        update(Job.__table__)
+        .where(Job.id.in_(due), _claimable(now, stale_before))
+        .values(status="running", locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        .returning(Job.id)
+    ).all()
+    db.session.commit()
+    return ids
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter: about JOB_RETRY_BASE * 2^(attempt-1), capped at JOB_RETRY_MAX."""
+    config = current_app.config
+    delay = min(config["JOB_RETRY_BASE"] * 2 ** (attempt - 1), config["JOB_RETRY_MAX"])
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _finish(job_id, worker_id, **values):
+    # only the worker holding the lock may finish a job; a stale one loses quietly
+    db.session.execute(
+        update(Job.__table__)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+        .values(locked_by=None, locked_at=None, **values)
+    )
+    db.session.commit()
+
+
+def run_job(job_id: int, worker_id: str) -> str:
+    """Run one claimed job and record the outcome. Returns the new status."""
+    job = db.session.get(Job, job_id)
+    task_name, attempts, max_attempts = job.task, job.attempts, job.max_attempts
+    payload = json.loads(job.payload)
+    db.session.commit()  # nothing held open while the task runs
+
+    started = time.perf_counter()
+    try:
+        TASKS[task_name](payload)
+    except Exception as exc:
+        db.session.rollback()
+        error = "".join(traceback.format_exception(exc))[-2000:]
+        if attempts >= max_attempts:
+            status, values = "failed", {"finished_at": datetime.now()}
+        else:
+            status, values = "queued", {"run_at": datetime.now() + timedelta(seconds=retry_delay(attempts))}
+        _finish(job_id, worker_id, status=status, last_error=error, **values)
+        current_app.logger.warning(
+            "Job %s %s attempt %d/%d failed (%s): %s", job_id, task_name, attempts, max_attempts, status, exc
+        )
+        return status
+
+    _finish(job_id, worker_id, status="done", last_error=None, finished_at=datetime.now())
+    current_app.logger.info("Job %s %s done in %.1f ms", job_id, task_name, (time.perf_counter() - started) * 1000)
+    return "done"
+
+
+class Worker:
+    """Polls the jobs table and runs due jobs on a pool of `threads`."""
+
+    def __init__(self, app, threads: int | None = None, poll_interval: float | None = None):
+        self.app = app
+        self.threads = threads or app.config["JOB_WORKER_THREADS"]
+        self.poll_interval = poll_interval if poll_interval is not None else app.config["JOB_POLL_INTERVAL"]
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.stopping = threading.Event()
+        self.counts = {"done": 0, "queued": 0, "failed": 0, "error": 0}
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                return run_job(job_id, self.worker_id)
+            except Exception:
+                # bookkeeping failed (e.g. database down); the lock times out and the job is retried
+                self.app.logger.exception("Worker could not run job %s", job_id)
+                return "error"
+            finally:
+                db.session.remove()
+
+    def run(self, once: bool = False):
+        """Work until stop() is called, or with `once` until nothing is due."""
+        inflight = set()
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="jobs") as pool:
+            while not self.stopping.is_set():
+                ids = []
+                free = self.threads - len(inflight)
+                if free > 0:
+                    with self.app.app_context():
+                        ids = claim_jobs(free, self.worker_id)
+                        db.session.remove()
+                inflight.update(pool.submit(self._run, job_id) for job_id in ids)
+                if not inflight:
+                    if once:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                finished, inflight = wait(
+                    inflight, timeout=None if free <= len(ids) else self.poll_interval,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in finished:
+                    self.counts[future.result()] += 1
+
+    def stop(self):
+        self.stopping.set()
+
+
+# -------------------------------------
+# Housekeeping
+# -------------------------------------
+def queue_stats() -> dict:
+    counts = dict(db.session.execute(db.select(Job.status, db.func.count()).group_by(Job.status)).all())
+    oldest = db.session.scalar(db.select(db.func.min(Job.run_at)).where(Job.status == "queued"))
+    return {
+        **{status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")},
+        "oldest_queued": oldest.isoformat() if oldest else None,
+    }
+
+
+def purge_finished(older_than_days: int) -> int:
+    """Delete done jobs finished more than `older_than_days` ago. Failed jobs are kept for inspection."""
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    deleted = db.session.execute(
+        db.delete(Job).where(Job.status == "done", Job.finished_at < cutoff)
+    ).rowcount
+    db.session.commit()
+    return deleted
@@ -0,0 +1,96 @@
+import smtplib
+import socketserver
+import threading
+from email.message import EmailMessage
+
+from flask import current_app
+
+
+# -------------------------------------
+# Sending
+# -------------------------------------
+def send_email(to: str, subject: str, body: str):
+    """Send a plain-text email with MAIL_BACKEND: 'smtp' (MAIL_SERVER:MAIL_PORT) or 'log'."""
+    config = current_app.config
+    message = EmailMessage()
+    message["From"] = config["MAIL_SENDER"]
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+
+    if config["MAIL_BACKEND"] == "log":
+        current_app.logger.info("Email to %s: %s", to, subject)
+        return
+    with smtplib.SMTP(config["MAIL_SERVER"], config["MAIL_PORT"], timeout=config["MAIL_TIMEOUT"]) as smtp:
+        smtp.send_message(message)
+
+
+# -------------------------------------
+# Local SMTP stand-in
+# -------------------------------------
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts every message and keeps it."""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost SMTP stand-in")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            verb = raw.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = raw.decode().split(":", 1)[1].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(raw.decode().split(":", 1)[1].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                self.server.deliver(sender, recipients, b"".join(lines))
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """An SMTP server that delivers nowhere: messages are kept in `messages` (and passed to `on_message`).
+
+        sink = SMTPSink(("127.0.0.1", 1025)).start()
+        ...
+        sink.messages[-1]["Subject"]
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 1025), on_message=None):
+        super().__init__(address, _SinkHandler)
+        self.messages = []
+        self.on_message = on_message
+        self._lock = threading.Lock()
+
+    def deliver(self, sender, recipients, data: bytes):
+        from email import message_from_bytes
+        from email.policy import default
+
+        message = message_from_bytes(data, policy=default)
+        with self._lock:
+            self.messages.append(message)
+        if self.on_message:
+            self.on_message(sender, recipients, message)
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
@@ -0,0 +1,73 @@
+import time
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import update
+
+from . import db
+from .cache import invalidate_events
+from .models import Event, JobState
+
+
+STATUS_JOB = "event-status"
+
+
+# -------------------------------------
+# Bulk event status transitions
+# -------------------------------------
+def refresh_event_statuses(full: bool = False) -> JobState:
+    """Bring Event.status in line with date and quantity using set-based UPDATEs.
+
+    Applies the same rules as Event.update_status() to the whole table:
+    past events become Inactive, Open events with no tickets become Sold Out
+    and restocked Sold Out events re-open. Cancelled events are never touched.
+    The Inactive pass only scans dates since the previous run (the high-water
+    mark) unless `full` is set. Returns the JobState row with the run stats.
+    """
+    started = time.perf_counter()
+    today = date.today()
+
+    state = db.session.get(JobState, STATUS_JOB)
+    if state is None:
+        state = JobState(name=STATUS_JOB)
+        db.session.add(state)
+    since = None if full or not state.watermark else date.fromisoformat(state.watermark)
+
+    # past events -> Inactive
+    expire = update(Event.__table__).where(
+        Event.date < today,
+        Event.status.in_(("Open", "Sold Out")),
+    )
+    if since is not None:
+        expire = expire.where(Event.date >= since)
+    # bump the change-tracking columns along with every status change
+    changed = {"version": Event.version + 1, "updated_at": datetime.now()}
+
+    touched = db.session.execute(expire.values(status="Inactive", **changed)).rowcount
+
+    # no tickets left -> Sold Out
+    touched += db.session.execute(
+        update(Event.__table__)
+        .where(Event.status == "Open", Event.quantity <= 0)
+        .values(status="Sold Out", **changed)
+    ).rowcount
+
+    # restocked upcoming events -> Open
+    touched += db.session.execute(
+        update(Event.__table__)
+        .where(Event.status == "Sold Out", Event.quantity > 0, Event.date >= today)
+        .values(status="Open", **changed)
+    ).rowcount
+
+    state.watermark = today.isoformat()
+    state.last_run_at = datetime.now()
+    state.rows_touched = touched
+    state.duration_ms = (time.perf_counter() - started) * 1000
+    db.session.commit()
+    if touched:
+        invalidate_events()
+
+    current_app.logger.info(
+        "Event status refresh: %d rows in %.1f ms", state.rows_touched, state.duration_ms
+    )
+    return state
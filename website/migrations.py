@@ -0,0 +1,163 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from . import db
+
+
+# -------------------------------------
+# Lightweight schema migrations
+# -------------------------------------
+# Each migration is a function taking a Connection, registered with a version
+# number. A fresh database is first built straight from the models, then every
+# database runs the versions it has not seen yet. Migrations must therefore be
+# safe to run against a schema that already has their change (IF NOT EXISTS,
+# _add_column). When you change models.py, add a new migration at the bottom
+# instead of deleting the database.
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def _create_indexes(conn, *names):
+    """Create the named model indexes (as declared in models.py) if they are missing."""
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in names:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _add_column(conn, table: str, column_ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there.
+
+    column_ddl is the column definition, e.g. "version INTEGER NOT NULL DEFAULT 1".
+    """
+    name = column_ddl.split()[0]
+    if name in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_ddl}"))
+
+
+@migration(1, "Ticket holds and job state tables")
+def _add_holds_and_job_state(conn):
+    from .models import JobState, TicketHold
+    db.metadata.create_all(conn, tables=[TicketHold.__table__, JobState.__table__])
+
+
+@migration(2, "Indexes for event listings, comments and orders")
+def _add_listing_indexes(conn):
+    _create_indexes(
+        conn,
+        "ix_events_date_id",
+        "ix_events_featuredevent_date",
+        "ix_events_creator_id_date",
+        "ix_events_genre_lower_date",
+        "ix_comments_event_id_created_at",
+        "ix_comments_user_id",
+        "ix_orders_user_id",
+        "ix_orders_event_id",
+        "ix_ticket_holds_event_id",
+    )
+
+
+@migration(3, "Full-text search index for events")
+def _add_search_index(conn):
+    from .search import FTS5SearchIndex
+    if FTS5SearchIndex.available(conn):
+        FTS5SearchIndex().rebuild(conn)
+
+
+@migration(4, "Change tracking columns on events and comments")
+def _add_change_tracking(conn):
+    _add_column(conn, "events", "updated_at DATETIME")
+    _add_column(conn, "events", "version INTEGER NOT NULL DEFAULT 1")
+    _add_column(conn, "comments", "updated_at DATETIME")
+    conn.execute(text("UPDATE events SET updated_at = :now WHERE updated_at IS NULL"), {"now": datetime.now()})
+    conn.execute(text("UPDATE comments SET updated_at = created_at WHERE updated_at IS NULL"))
+    _create_indexes(conn, "ix_events_updated_at")
+
+
+@migration(5, "Image variant columns on events")
+def _add_image_variants(conn):
+    _add_column(conn, "events", "image_hash VARCHAR(64)")
+    _add_column(conn, "events", "image_variants TEXT")
+
+
+
+@migration(6, "Sales and comment counters on events")
+def _add_event_counters(conn):
+    _add_column(conn, "events", "tickets_sold INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "events", "revenue FLOAT NOT NULL DEFAULT 0")
+    _add_column(conn, "events", "comment_count INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text(
+        "UPDATE events SET"
+        " tickets_sold = (SELECT COALESCE(SUM(quantity), 0) FROM orders WHERE orders.event_id = events.id),"
+        " revenue = (SELECT COALESCE(SUM(total_price), 0) FROM orders WHERE orders.event_id = events.id),"
+        " comment_count = (SELECT COUNT(*) FROM comments WHERE comments.event_id = events.id)"
+    ))
+
+
+@migration(7, "Hourly and daily sales rollup tables")
+def _add_sales_rollups(conn):
+    from .models import SalesDaily, SalesHourly
+    db.metadata.create_all(conn, tables=[SalesHourly.__table__, SalesDaily.__table__])
+
+
+@migration(8, "Background job queue table")
+def _add_jobs(conn):
+    from .models import Job
+    db.metadata.create_all(conn, tables=[Job.__table__])
+
+
+@migration(9, "Refund status on orders")
+def _add_order_refunds(conn):
+    _add_column(conn, "orders", "status VARCHAR(20) NOT NULL DEFAULT 'Paid'")
+    _add_column(conn, "orders", "refunded_at DATETIME")
+
+# -----------------------------
+# Runner
+# -----------------------------
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR(200),"
+        " applied_at TIMESTAMP)"
+    ))
+
+
+def _stamp(conn, version, description):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+        {"v": version, "d": description, "t": datetime.now()},
+    )
+
+
+def applied_versions(conn) -> set[int]:
+    _ensure_version_table(conn)
+    return set(conn.scalars(text("SELECT version FROM schema_migrations")))
+
+
+def upgrade() -> list[int]:
+    """Bring the database schema up to date. Returns the versions that ran."""
+    ran = []
+    with db.engine.begin() as conn:
+        fresh = not inspect(conn).has_table("events")
+        done = applied_versions(conn)
+
+        if fresh:
+            db.metadata.create_all(conn)
+
+        for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if version in done:
+                continue
+            fn(conn)
+            _stamp(conn, version, description)
+            ran.append(version)
+    return ran
@@ -1,3 +1,5 @@
+import json
+
 from . import db
 from datetime import datetime
 from flask_login import UserMixin
@@ -13,8 +15,9 @@ class User(db.Model, UserMixin):
 	# password should never stored in the DB, an encrypted password is stored
 	# the storage should be at least 255 chars long, depending on your hashing algorithm
     password_hash = db.Column(db.String(255), nullable=False)
-    # relation to call user.comments and comment.created_by
-    comments = db.relationship('Comment', backref='user')
+    # relation to call user.comments and comment.user
+    # (a comment is always shown with its author, so comment.user is joined in)
+    comments = db.relationship('Comment', backref=db.backref('user', lazy='joined'))
     # relation to call user.events and event.creator
     events = db.relationship('Event', backref='creator')
     
@@ -35,19 +38,50 @@ class Event(db.Model):
     price = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(200))
     image = db.Column(db.String(400))
+    # content hash of the uploaded original and the resized copies made from it
+    # ({"thumb"|"card"|"hero": {"webp": url, "jpeg": url}} as JSON), see images.py
+    image_hash = db.Column(db.String(64))
+    image_variants = db.Column(db.Text)
     featuredevent = db.Column(db.Boolean, default=False)
     genre = db.Column(db.String(50))
 
     # Event state (Open, Inactive, Sold Out, Cancelled)
     status = db.Column(db.String(20), nullable=False, default="Open")
 
+    # change tracking for HTTP validators (ETag / Last-Modified);
+    # raw UPDATEs on events must bump both, see reservations.take_tickets()
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, onupdate=db.text("version + 1"))
+
+    # running totals, so dashboards never aggregate orders or comments per request;
+    # kept in step by reservations.take_tickets(), holds.confirm_hold() and the
+    # comment route, and repaired by `flask reconcile-counters`
+    tickets_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+
     # Create the Comments db.relationship
 	# relation to call event.comments and comment.event
-    comments = db.relationship('Comment', backref='event')
+    # write_only: a busy event can have thousands of comments, so they are
+    # only ever fetched a page at a time with event.comments.select()
+    comments = db.relationship('Comment', backref='event', lazy='write_only')
 
     # add the foreign key to link to User (event creator)
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    # indexes for the listing pages (home, featured carousel, my events)
+    __table_args__ = (
+        db.Index('ix_events_date_id', 'date', 'id'),
+        db.Index('ix_events_featuredevent_date', 'featuredevent', 'date'),
+        db.Index('ix_events_creator_id_date', 'creator_id', 'date'),
+    )
+
+    def image_url(self, variant: str, fmt: str = "jpeg"):
+        """URL of a resized copy of the event image, or the original until it is ready."""
+        if self.image_variants:
+            return json.loads(self.image_variants).get(variant, {}).get(fmt, self.image)
+        return self.image
+
     # update event status based on date and ticket availability
     def update_status(self):
         if self.status == "Cancelled":
@@ -70,15 +104,25 @@ class Event(db.Model):
     def __repr__(self):
         return f"Event title: {self.title}"
 
+
+# genre pages match case-insensitively on lower(genre)
+db.Index('ix_events_genre_lower_date', db.func.lower(Event.genre), Event.date)
+
 class Comment(db.Model):
     __tablename__ = 'comments'
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     # add the foreign key
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
 
+    # event pages list comments in posting order
+    __table_args__ = (
+        db.Index('ix_comments_event_id_created_at', 'event_id', 'created_at'),
+    )
+
     # string print method
     def __repr__(self):
         return f"Comment: {self.text}"
@@ -89,16 +133,112 @@ class Order(db.Model):
     order_date = db.Column(db.DateTime)
     quantity = db.Column(db.Integer, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
+    # Paid, or Refunded once the event is cancelled (see refunds.py)
+    status = db.Column(db.String(20), nullable=False, default="Paid")
+    refunded_at = db.Column(db.DateTime)
     # add the foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), index=True)
 
     # relationship to Event and User
-    event = db.relationship('Event', backref='orders')
+    # (event.orders is write_only for the same reason as event.comments)
+    event = db.relationship('Event', backref=db.backref('orders', lazy='write_only'))
     user = db.relationship('User', backref='orders')
 
     # calculate total price
     def calculate_total(self):
         """Calculate total based on event.price * quantity."""
         if self.event and self.quantity:
-            self.total_price = float(self.event.price) * self.quantity
\ No newline at end of file
+            self.total_price = float(self.event.price) * self.quantity
+
+class TicketHold(db.Model):
+    __tablename__ = 'ticket_holds'
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(64), unique=True, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    # Hold state (Held, Confirmed, Released, Expired)
+    status = db.Column(db.String(20), nullable=False, default="Held")
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    # add the foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False, index=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+
+    # relationship to Event, User and the Order created on confirm
+    event = db.relationship('Event')
+    user = db.relationship('User')
+    order = db.relationship('Order')
+
+    # the sweeper looks up live holds by expiry
+    __table_args__ = (
+        db.Index('ix_ticket_holds_status_expires_at', 'status', 'expires_at'),
+    )
+
+    def is_live(self):
+        return self.status == "Held" and self.expires_at > datetime.now()
+
+    # string print method
+    def __repr__(self):
+        return f"Hold {self.token}: {self.quantity} x event {self.event_id}"
+
+
+class JobState(db.Model):
+    """Bookkeeping for background jobs: where the last run stopped and what it did."""
+    __tablename__ = 'job_state'
+    name = db.Column(db.String(50), primary_key=True)
+    watermark = db.Column(db.String(50))
+    last_run_at = db.Column(db.DateTime)
+    rows_touched = db.Column(db.Integer, default=0)
+    duration_ms = db.Column(db.Float, default=0)
+
+    # string print method
+    def __repr__(self):
+        return f"Job {self.name} @ {self.watermark}"
+
+
+class SalesHourly(db.Model):
+    """Orders, tickets and revenue per event per hour, rolled up from orders (see analytics.py)."""
+    __tablename__ = 'sales_hourly'
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    tickets = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class SalesDaily(db.Model):
+    """Same as SalesHourly, one row per event per day."""
+    __tablename__ = 'sales_daily'
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    tickets = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class Job(db.Model):
+    """A unit of background work (see jobs.py): emails and other side effects kept off the request path."""
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    # a second enqueue with the same key is ignored, so retried work never duplicates
+    idempotency_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+
+    # workers pick the oldest due job of a status
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f"Job {self.id} {self.task} ({self.status})"
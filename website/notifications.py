@@ -0,0 +1,90 @@
+from flask import current_app
+
+from . import db
+from .jobs import enqueue, enqueue_many, task
+from .mailer import send_email
+from .models import Event, Order, User
+
+
+# -------------------------------------
+# Tasks
+# -------------------------------------
+@task("send-email")
+def send_email_task(payload):
+    send_email(payload["to"], payload["subject"], payload["body"])
+
+
+@task("booking-confirmation")
+def booking_confirmation(payload):
+    row = db.session.execute(
+        db.select(Order.id, Order.quantity, Order.total_price, User.email, User.first_name,
+                  Event.title, Event.venue, Event.date, Event.start_time)
+        .join(User, User.id == Order.user_id)
+        .join(Event, Event.id == Order.event_id)
+        .where(Order.id == payload["order_id"])
+    ).first()
+    if row is None:
+        return
+    send_email(
+        row.email,
+        f"Your tickets for {row.title}",
+        f"Hi {row.first_name},\n\n"
+        f"Order #{row.id} is confirmed: {row.quantity} ticket(s) for {row.title} "
+        f"at {row.venue} on {row.date:%d %B %Y}, starting {row.start_time:%H:%M}.\n"
+        f"Total paid: ${row.total_price:.2f}\n",
+    )
+
+
+@task("notify-cancellation")
+def notify_cancellation(payload):
+    """Queue one email per ticket holder of a cancelled event, JOB_FANOUT_BATCH holders at a time.
+
+    Each run handles the holders after `after` (a user id) and queues the
+    next batch as a job of its own, so a big event never means one long
+    transaction and a retry only repeats its own batch. The idempotency keys
+    make repeated runs harmless.
+    """
+    event_id, after = payload["event_id"], payload.get("after", 0)
+    limit = current_app.config["JOB_FANOUT_BATCH"]
+    event = db.session.execute(
+        db.select(Event.title, Event.date).where(Event.id == event_id)
+    ).first()
+    if event is None:
+        return
+    holders = db.session.execute(
+        db.select(User.id, User.email, User.first_name, db.func.sum(Order.quantity).label("tickets"))
+        .join(Order, Order.user_id == User.id)
+        .where(Order.event_id == event_id, User.id > after)
+        .group_by(User.id)
+        .order_by(User.id)
+        .limit(limit)
+    ).all()
+
+    enqueue_many("send-email", [
+        ({
+            "to": h.email,
+            "subject": f"Cancelled: {event.title}",
+            "body": f"Hi {h.first_name},\n\n"
+                    f"{event.title} on {event.date:%d %B %Y} has been cancelled. "
+                    f"Your {h.tickets} ticket(s) will be refunded in full.\n",
+        }, f"cancel-notice:{event_id}:{h.id}")
+        for h in holders
+    ])
+    if len(holders) == limit:
+        last = holders[-1].id
+        enqueue("notify-cancellation", {"event_id": event_id, "after": last},
+                key=f"cancel-fanout:{event_id}:{last}")
+    db.session.commit()
+
+
+# -------------------------------------
+# Hooks for the write paths
+# -------------------------------------
+def queue_booking_confirmation(order: Order):
+    """Queue the confirmation email for a flushed order. Does not commit."""
+    enqueue("booking-confirmation", {"order_id": order.id}, key=f"booking-confirmation:{order.id}")
+
+
+def queue_cancellation_notices(event_id):
+    """Queue the fan-out of cancellation emails for an event. Does not commit."""
+    enqueue("notify-cancellation", {"event_id": int(event_id), "after": 0}, key=f"cancel-fanout:{event_id}:0")
@@ -0,0 +1,71 @@
+import base64
+from dataclasses import dataclass
+from datetime import date
+
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+from .models import Event
+
+
+# -------------------------------------
+# Keyset (cursor) pagination on (date, id)
+# -------------------------------------
+@dataclass
+class Page:
+    items: list
+    next_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(ev: Event) -> str:
+    raw = f"{ev.date.isoformat()}|{ev.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None):
+    """Turn a cursor back into (date, id). Returns None for a missing or garbled cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, event_id = raw.split("|")
+        return date.fromisoformat(day), int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size() -> int:
+    """Page size from ?limit=, defaulting to PAGE_SIZE and capped at MAX_PAGE_SIZE."""
+    default = current_app.config["PAGE_SIZE"]
+    requested = request.args.get("limit", default, type=int)
+    return max(1, min(requested, current_app.config["MAX_PAGE_SIZE"]))
+
+
+def keyset_page(query, cursor: str | None = None, limit: int | None = None, descending: bool = False) -> Page:
+    """Fetch one page of an Event query ordered by (date, id), starting after `cursor`.
+
+    Uses a row-value comparison against the (date, id) index instead of
+    OFFSET, so every page costs the same however deep the client scrolls.
+    """
+    limit = limit or page_size()
+    key = tuple_(Event.date, Event.id)
+
+    after = decode_cursor(cursor)
+    if after is not None:
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    # replace whatever order the query came with by the full (date, id) key
+    query = query.order_by(None)
+    if descending:
+        query = query.order_by(Event.date.desc(), Event.id.desc())
+    else:
+        query = query.order_by(Event.date.asc(), Event.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return Page(items, next_cursor)
@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from flask_bcrypt import check_password_hash, generate_password_hash
+
+from . import db
+from .models import User
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Every hashing slot stayed taken for PASSWORD_QUEUE_TIMEOUT seconds."""
+
+
+# -------------------------------------
+# Worker pool
+# -------------------------------------
+def init_passwords(app):
+    """bcrypt runs on a small pool; at most PASSWORD_MAX_PENDING hashes may be running or queued."""
+    app.extensions["password_pool"] = ThreadPoolExecutor(
+        max_workers=app.config["PASSWORD_WORKERS"], thread_name_prefix="passwords"
+    )
+    app.extensions["password_slots"] = threading.BoundedSemaphore(app.config["PASSWORD_MAX_PENDING"])
+    app.extensions["password_dummies"] = {}
+
+
+def _run(fn, *args):
+    # bcrypt releases the GIL, so a pool sized to the cores keeps them busy
+    # without letting a login storm queue unbounded work behind the requests
+    slots = current_app.extensions["password_slots"]
+    if not slots.acquire(timeout=current_app.config["PASSWORD_QUEUE_TIMEOUT"]):
+        raise PasswordHashingBusy("password hashing pool is saturated")
+    try:
+        future = current_app.extensions["password_pool"].submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+# -------------------------------------
+# Hashing
+# -------------------------------------
+def hash_rounds(password_hash: str) -> int | None:
+    """Cost factor of a bcrypt hash ('$2b$12$...' -> 12), None if it isn't one."""
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def hash_password(password: str) -> str:
+    rounds = current_app.config["BCRYPT_LOG_ROUNDS"]
+    hashed = _run(generate_password_hash, password, rounds)
+    return hashed.decode() if isinstance(hashed, bytes) else hashed
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return hash_rounds(password_hash) != current_app.config["BCRYPT_LOG_ROUNDS"]
+
+
+def _dummy_hash() -> str:
+    """A hash at the current cost to check against when the email is unknown."""
+    dummies = current_app.extensions["password_dummies"]
+    rounds = current_app.config["BCRYPT_LOG_ROUNDS"]
+    if rounds not in dummies:
+        dummies[rounds] = hash_password("not-a-real-password")
+    return dummies[rounds]
+
+
+def authenticate(email: str, password: str) -> User | None:
+    """The user with this email and password, else None.
+
+    Unknown emails are checked against a dummy hash, so the response takes
+    as long as a wrong password and doesn't reveal which emails exist. A
+    successful login with a hash of another cost is rehashed at
+    BCRYPT_LOG_ROUNDS.
+    """
+    user = db.session.scalar(db.select(User).where(User.email == email))
+    if user is None:
+        verify_password(_dummy_hash(), password)
+        return None
+    if not verify_password(user.password_hash, password):
+        return None
+    if needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+        db.session.commit()
+    return user
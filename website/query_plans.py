@@ -0,0 +1,64 @@
+import re
+
+from . import db
+from .models import Comment, Event, Order, SalesDaily, SalesHourly
+
+
+# a plan step that reads a whole table without an index; the \b stops \w+ from
+# backtracking a character so that the lookahead no longer sees " USING"
+FULL_SCAN = re.compile(r"\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)")
+
+# plan lines with a known answer, checked before trusting FULL_SCAN
+PATTERN_CASES = {
+    "SCAN events": True,
+    "SCAN events USING INDEX ix_events_date_id": False,
+    "SCAN events USING COVERING INDEX ix_events_genre_lower_date": False,
+    "SEARCH events USING INDEX ix_events_date_id (date>?)": False,
+}
+
+
+def pattern_errors() -> list[str]:
+    """Plan lines from PATTERN_CASES that FULL_SCAN classifies wrongly."""
+    return [line for line, full in PATTERN_CASES.items() if bool(FULL_SCAN.search(line)) != full]
+
+
+def listing_queries() -> dict:
+    """The queries behind the listing pages, keyed by a readable name."""
+    from .browse import Browse, browse_query
+    from .views import _featured_events_query
+    from .events import _creator_events_query
+
+    queries = {f"home:{w}": browse_query(Browse(window=w)) for w in ("upcoming", "today", "weekend", "past")}
+    queries["home:featured"] = _featured_events_query()
+    queries["my_events"] = _creator_events_query(1)
+    queries["genre"] = browse_query(Browse(window="any", genre="Rock"))
+    queries["browse:genre+window+price+status"] = browse_query(
+        Browse(window="upcoming", genre="Rock", price_min=10, price_max=50, status="Open")
+    )
+    queries["event:comments"] = Comment.query.filter_by(event_id=1).order_by(Comment.created_at)
+    queries["bookings"] = Order.query.filter_by(user_id=1)
+    for rollup in (SalesDaily, SalesHourly):
+        queries[f"analytics:{rollup.__tablename__}"] = (
+            rollup.query.join(Event, Event.id == rollup.event_id)
+            .filter(Event.creator_id == 1, rollup.bucket >= "2030-01-01")
+        )
+    return queries
+
+
+def explain(query) -> list[str]:
+    """Return the EXPLAIN QUERY PLAN detail lines for an ORM query (SQLite only)."""
+    compiled = query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans() -> dict:
+    """Map query name -> plan lines for every listing query that scans a whole table."""
+    problems = {}
+    for name, query in listing_queries().items():
+        plan = explain(query)
+        if any(FULL_SCAN.search(line) for line in plan):
+            problems[name] = plan
+    return problems
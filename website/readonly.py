@@ -0,0 +1,88 @@
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import make_url
+
+READ_ONLY_BIND = "readonly"
+
+
+class ReadOnlyViolation(RuntimeError):
+    """A route marked @read_only tried to write."""
+
+
+# -------------------------------------
+# Read-only engine
+# -------------------------------------
+def read_only_url(app) -> str | None:
+    """URL of the read-only engine: READ_REPLICA_URL, else the primary SQLite file opened mode=ro.
+
+    Returns None when there is nothing separate to read from (routing off,
+    or an in-memory / non-SQLite primary without a replica configured).
+    """
+    if not app.config["READ_ONLY_ROUTING"]:
+        return None
+    if app.config["READ_REPLICA_URL"]:
+        return app.config["READ_REPLICA_URL"]
+
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    if url.query.get("uri"):
+        return str(url.update_query_dict({"mode": "ro"}))
+    # relative paths are resolved against the instance folder, as for the primary
+    return str(url.set(database=f"file:{url.database}").update_query_dict({"mode": "ro", "uri": "true"}))
+
+
+def configure_read_only_bind(app):
+    """Add the read-only engine to SQLALCHEMY_BINDS, sized like the primary.
+
+    Must run after database.configure_engine_options() and before db.init_app().
+    """
+    url = read_only_url(app)
+    if url:
+        options = {**app.config["SQLALCHEMY_ENGINE_OPTIONS"], "url": url}
+        app.config.setdefault("SQLALCHEMY_BINDS", {})[READ_ONLY_BIND] = options
+
+
+# -------------------------------------
+# Route marking
+# -------------------------------------
+def read_only(view):
+    """Run a view's queries on the read-only engine and refuse any flush it attempts."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        g.read_only = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.read_only = False
+    return wrapped
+
+
+def in_read_only_route() -> bool:
+    return has_app_context() and g.get("read_only", False)
+
+
+# -------------------------------------
+# Session
+# -------------------------------------
+class RoutingSession(Session):
+    """db.session that sends statements to the read-only engine inside @read_only views."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and in_read_only_route():
+            engine = self._db.engines.get(READ_ONLY_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@sa_event.listens_for(RoutingSession, "before_flush")
+def _refuse_read_only_flush(session, flush_context, instances):
+    if in_read_only_route() and (session.new or session.dirty or session.deleted):
+        raise ReadOnlyViolation(
+            f"flush inside read-only route {request.endpoint} "
+            f"({len(session.new)} new, {len(session.dirty)} dirty, {len(session.deleted)} deleted)"
+        )
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update
+
+from . import db
+from .jobs import enqueue, task
+from .models import Event, JobState, Order
+
+
+def _job_name(event_id) -> str:
+    return f"refund:{int(event_id)}"
+
+
+# -------------------------------------
+# Batched refunds for a cancelled event
+# -------------------------------------
+def refund_event_orders(event_id, batch_size: int | None = None, progress=None) -> JobState:
+    """Mark every Paid order of a cancelled event Refunded, `batch_size` orders per transaction.
+
+    Each batch is one UPDATE over the next orders by id (ix_orders_event_id),
+    committed together with the JobState watermark, so a run that dies part
+    way resumes after the last committed batch. The watermark is advanced
+    with a compare-and-set, as in rollup_sales(), so overlapping runs never
+    refund the same batch twice. Tickets are not returned to inventory and
+    the sales counters and rollups are left as sold.
+    `progress(rows, batch_ms, total)` is called after every batch.
+    Returns the JobState row with the run stats.
+    """
+    batch_size = batch_size or current_app.config["REFUND_BATCH"]
+    status = db.session.scalar(db.select(Event.status).where(Event.id == event_id))
+    if status != "Cancelled":
+        raise ValueError(f"Event {event_id} is not cancelled")
+
+    name = _job_name(event_id)
+    if db.session.get(JobState, name) is None:
+        db.session.add(JobState(name=name, watermark="0", rows_touched=0))
+        db.session.commit()
+
+    started = time.perf_counter()
+    refunded = 0
+    while True:
+        batch_started = time.perf_counter()
+        watermark = db.session.scalar(db.select(JobState.watermark).where(JobState.name == name))
+        batch = (
+            db.select(Order.id)
+            .where(Order.event_id == event_id, Order.id > int(watermark), Order.status == "Paid")
+            .order_by(Order.id)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        ids = db.session.scalars(
+            update(Order.__table__)
+            .where(Order.id.in_(batch), Order.status == "Paid")
+            .values(status="Refunded", refunded_at=datetime.now())
+            .returning(Order.id)
+        ).all()
+        if not ids:
+            db.session.rollback()
+            break
+
+        claimed = db.session.execute(
+            update(JobState.__table__)
+            .where(JobState.name == name, JobState.watermark == watermark)
+            .values(watermark=str(max(ids)), rows_touched=JobState.rows_touched + len(ids))
+        ).rowcount
+        if not claimed:
+            # another run got there first; it carries on from here
+            db.session.rollback()
+            break
+        db.session.commit()
+        refunded += len(ids)
+
+        batch_ms = (time.perf_counter() - batch_started) * 1000
+        current_app.logger.info("Refunds for event %s: %d orders in %.1f ms", event_id, len(ids), batch_ms)
+        if progress:
+            progress(len(ids), batch_ms, refunded)
+        if len(ids) < batch_size:
+            break
+
+    state = db.session.get(JobState, name)
+    state.last_run_at = datetime.now()
+    state.duration_ms = (time.perf_counter() - started) * 1000
+    db.session.commit()
+
+    current_app.logger.info(
+        "Refunds for event %s: %d orders this run (%d in total) in %.1f ms",
+        event_id, refunded, state.rows_touched, state.duration_ms,
+    )
+    return state
+
+
+@task("refund-orders")
+def refund_orders_task(payload):
+    refund_event_orders(payload["event_id"])
+
+
+def queue_refunds(event_id):
+    """Queue the refund run for a cancelled event. Does not commit."""
+    enqueue("refund-orders", {"event_id": int(event_id)}, key=_job_name(event_id))
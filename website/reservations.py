@@ -0,0 +1,133 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, update
+from sqlalchemy.exc import OperationalError
+
+from . import db
+from .counters import sale_values
+from .models import Event, Order, TicketHold
+from .notifications import queue_booking_confirmation
+
+
+# -------------------------------
+# Reservation outcome
+# -------------------------------
+@dataclass
+class ReservationResult:
+    """Outcome of a reservation attempt.
+
+    status is one of "ok", "insufficient", "sold_out", "closed" or "not_found".
+    remaining is the ticket count left on the event after the attempt.
+    """
+    status: str
+    remaining: int | None = None
+    event_status: str | None = None
+    order: Order | None = None
+    hold: TicketHold | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def _is_locked(exc: OperationalError) -> bool:
+    return "database is locked" in str(exc.orig).lower()
+
+
+def _with_retries(fn):
+    """Run fn(), rolling back and retrying while SQLite reports the database is locked."""
+    max_retries = current_app.config.get("RESERVATION_MAX_RETRIES", 5)
+    delay = current_app.config.get("RESERVATION_RETRY_DELAY", 0.02)
+
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except OperationalError as exc:
+            db.session.rollback()
+            if not _is_locked(exc) or attempt == max_retries:
+                raise
+            current_app.logger.info("Reservation retry %d after lock contention", attempt + 1)
+            time.sleep(delay * (2 ** attempt))
+
+
+# -------------------------------------
+# Atomic inventory decrement
+# -------------------------------------
+def take_tickets(event_id, quantity: int, sold: bool = False):
+    """Decrement Event.quantity by `quantity` in a single conditional UPDATE.
+
+    The row only changes when the event is Open and has at least `quantity`
+    tickets left, so concurrent buyers can never push it below zero. The event
+    flips to "Sold Out" in the same statement when the last ticket goes.
+    With `sold`, the tickets_sold / revenue counters move in the same statement
+    (holds pass False and count the sale on confirm instead).
+    Returns the (remaining, price) row, or None when nothing was taken.
+    Does not commit.
+    """
+    stmt = (
+        update(Event.__table__)
+        .where(
+            Event.id == event_id,
+            Event.status == "Open",
+            Event.quantity >= quantity,
+        )
+        .values(
+            quantity=Event.quantity - quantity,
+            status=case((Event.quantity - quantity <= 0, "Sold Out"), else_=Event.status),
+            version=Event.version + 1,
+            updated_at=datetime.now(),
+            **(sale_values(quantity) if sold else {}),
+        )
+        .returning(Event.quantity, Event.price)
+    )
+    return db.session.execute(stmt).first()
+
+
+def _explain_miss(event_id, quantity: int) -> ReservationResult:
+    """Work out why take_tickets() matched no row (only runs on the failure path)."""
+    row = db.session.execute(
+        db.select(Event.quantity, Event.status).where(Event.id == event_id)
+    ).first()
+    db.session.rollback()
+
+    if row is None:
+        return ReservationResult("not_found")
+    if row.status == "Sold Out" or (row.status == "Open" and row.quantity <= 0):
+        return ReservationResult("sold_out", remaining=0, event_status=row.status)
+    if row.status != "Open":
+        return ReservationResult("closed", remaining=row.quantity, event_status=row.status)
+    return ReservationResult("insufficient", remaining=row.quantity, event_status=row.status)
+
+
+# -----------------------------
+# Purchase
+# -----------------------------
+def purchase_tickets(event_id, user_id, quantity: int) -> ReservationResult:
+    """Reserve tickets and record the Order in one transaction."""
+    def attempt():
+        row = take_tickets(event_id, quantity, sold=True)
+        if row is None:
+            return _explain_miss(event_id, quantity)
+
+        order = Order(
+            user_id=user_id,
+            event_id=event_id,
+            quantity=quantity,
+            total_price=float(row.price) * quantity,
+            order_date=datetime.now(),
+        )
+        db.session.add(order)
+        db.session.flush()
+        queue_booking_confirmation(order)
+        db.session.commit()
+        return ReservationResult(
+            "ok",
+            remaining=row.quantity,
+            event_status="Sold Out" if row.quantity <= 0 else "Open",
+            order=order,
+        )
+
+    return _with_retries(attempt)
@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+# -------------------------------------
+# Tiny in-process periodic scheduler
+# -------------------------------------
+def start_periodic(app, name: str, interval: float, job):
+    """Run job() every `interval` seconds on a daemon thread inside an app context.
+
+    An interval of 0 (or None) disables the job. Errors are logged and the
+    loop keeps going, so one bad run never stops later ones.
+    """
+    if not interval:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    job()
+                except Exception:
+                    app.logger.exception("Scheduled job %s failed", name)
+
+    thread = threading.Thread(target=loop, name=f"scheduler-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_schedulers(app) -> list:
+    """Start the hold sweeper, status refresh and sales rollup. Returns the running threads.
+
+    Run them in exactly one process: each process that calls this repeats
+    every job, and they should not run beside migrations or imports.
+    """
+    from .analytics import rollup_sales
+    from .holds import sweep_expired_holds
+    from .maintenance import refresh_event_statuses
+
+    threads = [
+        start_periodic(app, 'sweep-holds', app.config['HOLD_SWEEP_INTERVAL'], sweep_expired_holds),
+        start_periodic(app, 'refresh-statuses', app.config['STATUS_REFRESH_INTERVAL'], refresh_event_statuses),
+        start_periodic(app, 'rollup-sales', app.config['ANALYTICS_ROLLUP_INTERVAL'], rollup_sales),
+    ]
+    return [t for t in threads if t is not None]
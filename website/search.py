@@ -0,0 +1,252 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import event as sa_event, inspect as sa_inspect, text
+from flask_sqlalchemy.session import Session
+
+from . import db
+from .models import Event
+
+
+# field weights used for ranking: a hit in the title counts most
+FIELDS = ("title", "genre", "venue", "description")
+WEIGHTS = {"title": 10.0, "genre": 5.0, "venue": 3.0, "description": 1.0}
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(value) -> list[str]:
+    return TOKEN.findall((value or "").lower())
+
+
+def _indexable(ev) -> bool:
+    return ev.status != "Cancelled"
+
+
+# -------------------------------------
+# SQLite FTS5 backend
+# -------------------------------------
+class FTS5SearchIndex:
+    """Full-text index stored in an FTS5 virtual table keyed by events.id."""
+
+    name = "fts5"
+
+    @staticmethod
+    def available(conn) -> bool:
+        if conn.dialect.name != "sqlite":
+            return False
+        try:
+            conn.exec_driver_sql("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+            conn.exec_driver_sql("DROP TABLE temp.fts5_probe")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def create(conn):
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts "
+            "USING fts5(title, genre, venue, description, tokenize='unicode61')"
+        )
+
+    def rebuild(self, conn):
+        self.create(conn)
+        conn.exec_driver_sql("DELETE FROM events_fts")
+        conn.exec_driver_sql(
+            "INSERT INTO events_fts (rowid, title, genre, venue, description) "
+            "SELECT id, title, genre, venue, description FROM events WHERE status != 'Cancelled'"
+        )
+
+    def upsert(self, conn, ev):
+        self.remove(conn, ev.id)
+        if _indexable(ev):
+            conn.execute(
+                text(
+                    "INSERT INTO events_fts (rowid, title, genre, venue, description) "
+                    "VALUES (:id, :title, :genre, :venue, :description)"
+                ),
+                {"id": ev.id, **{f: getattr(ev, f) for f in FIELDS}},
+            )
+
+    def remove(self, conn, event_id):
+        conn.execute(text("DELETE FROM events_fts WHERE rowid = :id"), {"id": event_id})
+
+    def search(self, conn, terms, limit, offset):
+        match = " AND ".join(f'"{t}"*' for t in terms)
+        weights = ", ".join(str(WEIGHTS[f]) for f in FIELDS)
+        total = conn.execute(
+            text("SELECT count(*) FROM events_fts WHERE events_fts MATCH :q"), {"q": match}
+        ).scalar()
+        ids = conn.execute(
+            text(
+                f"SELECT rowid FROM events_fts WHERE events_fts MATCH :q "
+                f"ORDER BY bm25(events_fts, {weights}), rowid LIMIT :limit OFFSET :offset"
+            ),
+            {"q": match, "limit": limit, "offset": offset},
+        ).scalars().all()
+        return ids, total
+
+
+# -------------------------------------
+# Pure-Python fallback backend
+# -------------------------------------
+class PythonSearchIndex:
+    """In-process inverted index used when FTS5 is not available.
+
+    Built from the events table on first use and then kept current by the
+    same flush hook as the FTS5 index. Each process holds its own copy.
+    """
+
+    name = "python"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(dict)   # token -> {event_id: score}
+        self._docs = {}                      # event_id -> set of tokens
+        self._vocab = None                   # sorted tokens for prefix lookups, rebuilt lazily
+        self._loaded = False
+
+    def _ensure_loaded(self, conn):
+        if self._loaded:
+            return
+        rows = conn.execute(
+            text("SELECT id, title, genre, venue, description FROM events WHERE status != 'Cancelled'")
+        ).mappings()
+        with self._lock:
+            for row in rows:
+                self._add(row["id"], row)
+            self._vocab = None
+            self._loaded = True
+
+    def _add(self, event_id, doc):
+        tokens = set()
+        for field in FIELDS:
+            for token in tokenize(doc[field]):
+                self._postings[token][event_id] = self._postings[token].get(event_id, 0) + WEIGHTS[field]
+                tokens.add(token)
+        self._docs[event_id] = tokens
+
+    def _drop(self, event_id):
+        for token in self._docs.pop(event_id, ()):
+            postings = self._postings[token]
+            postings.pop(event_id, None)
+            if not postings:
+                del self._postings[token]
+
+    def rebuild(self, conn):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._loaded = False
+        self._ensure_loaded(conn)
+
+    def upsert(self, conn, ev):
+        if not self._loaded:
+            return  # picked up when the index is first built
+        with self._lock:
+            self._drop(ev.id)
+            if _indexable(ev):
+                self._add(ev.id, {f: getattr(ev, f) for f in FIELDS})
+            self._vocab = None
+
+    def remove(self, conn, event_id):
+        with self._lock:
+            self._drop(event_id)
+            self._vocab = None
+
+    def _prefix_matches(self, term) -> dict:
+        scores = defaultdict(float)
+        position = bisect.bisect_left(self._vocab, term)
+        while position < len(self._vocab) and self._vocab[position].startswith(term):
+            token = self._vocab[position]
+            position += 1
+            for event_id, score in self._postings[token].items():
+                scores[event_id] += score
+        return scores
+
+    def search(self, conn, terms, limit, offset):
+        self._ensure_loaded(conn)
+        with self._lock:
+            if self._vocab is None:
+                self._vocab = sorted(self._postings)
+            scores = None
+            for term in terms:
+                matches = self._prefix_matches(term)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {i: s + matches[i] for i, s in scores.items() if i in matches}
+        ranked = sorted((scores or {}).items(), key=lambda item: (-item[1], item[0]))
+        return [i for i, _ in ranked[offset:offset + limit]], len(ranked)
+
+
+# -----------------------------
+# Backend selection
+# -----------------------------
+_init_lock = threading.Lock()
+
+
+def get_index():
+    """The search backend for the current app, chosen on first use (SEARCH_BACKEND)."""
+    index = current_app.extensions.get("search_index")
+    if index is None:
+        with _init_lock:
+            index = current_app.extensions.get("search_index")
+            if index is None:
+                backend = current_app.config.get("SEARCH_BACKEND", "auto")
+                if backend == "auto":
+                    with db.engine.connect() as conn:
+                        backend = "fts5" if FTS5SearchIndex.available(conn) else "python"
+                index = FTS5SearchIndex() if backend == "fts5" else PythonSearchIndex()
+                current_app.extensions["search_index"] = index
+    return index
+
+
+def search_events(query_text: str, page: int = 1, per_page: int = 20):
+    """Ranked, prefix-matching search. Returns (events, total) for the requested page."""
+    terms = tokenize(query_text)
+    if not terms:
+        return [], 0
+
+    conn = db.session.connection()
+    ids, total = get_index().search(conn, terms, per_page, (page - 1) * per_page)
+    if not ids:
+        return [], total
+
+    by_id = {ev.id: ev for ev in db.session.scalars(db.select(Event).where(Event.id.in_(ids)))}
+    return [by_id[i] for i in ids if i in by_id], total
+
+
+def rebuild_index():
+    with db.engine.begin() as conn:
+        get_index().rebuild(conn)
+
+
+# -------------------------------------
+# Keep the index in sync with Event writes
+# -------------------------------------
+def _needs_reindex(obj) -> bool:
+    if not isinstance(obj, Event):
+        return False
+    state = sa_inspect(obj)
+    return state.pending or any(
+        state.attrs[field].history.has_changes() for field in (*FIELDS, "status")
+    )
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _sync_after_flush(session, flush_context):
+    touched = [obj for obj in session.new | session.dirty if _needs_reindex(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Event)]
+    if not touched and not deleted:
+        return
+
+    index = get_index()
+    conn = session.connection()
+    for ev in touched:
+        index.upsert(conn, ev)
+    for ev in deleted:
+        index.remove(conn, ev.id)
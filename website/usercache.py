@@ -0,0 +1,110 @@
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import make_transient_to_detached
+
+from . import db
+from .cache import LRUCache
+from .models import User
+
+# everything the pages show about a user; the hash stays out of memory and
+# is loaded on demand if anything asks for it
+CACHED_COLUMNS = tuple(c.key for c in User.__table__.columns if c.key != "password_hash")
+
+
+class UserCache:
+    """Column values of recently seen users, so an authenticated request needs no SELECT on users."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.enabled = ttl > 0 and max_entries > 0
+        self.entries = LRUCache(max_entries, ttl)
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> dict | None:
+        return self.entries.get(user_id) if self.enabled else None
+
+    def put(self, user: User):
+        if self.enabled:
+            self.entries.set(user.id, {key: getattr(user, key) for key in CACHED_COLUMNS})
+
+    def invalidate(self, user_id: int):
+        self.entries.delete(user_id)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        entries = self.entries.stats()
+        return {
+            "enabled": self.enabled,
+            "entries": entries["entries"],
+            "lookups_avoided": entries["hits"],
+            "db_lookups": entries["misses"],
+            "invalidations": self.invalidations,
+            "expirations": entries["expirations"],
+            "evictions": entries["evictions"],
+        }
+
+
+def init_user_cache(app):
+    app.extensions["user_cache"] = UserCache(app.config["USER_CACHE_MAX_ENTRIES"], app.config["USER_CACHE_TTL"])
+
+
+def get_user_cache() -> UserCache:
+    return current_app.extensions["user_cache"]
+
+
+# -------------------------------------
+# Flask-Login user_loader
+# -------------------------------------
+def load_user(user_id):
+    """The logged-in user, from the cache when possible.
+
+    A cached user is rebuilt from its columns and merged into db.session with
+    load=False, so it is in the identity map like a queried one: a later
+    db.session.get(User, id) or event.creator for the same user costs no
+    query, and relationships such as .orders load once per request.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    cache = get_user_cache()
+    columns = cache.get(user_id)
+    if columns is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            cache.put(user)
+        return user
+
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+# -------------------------------------
+# Invalidation on profile / password change
+# -------------------------------------
+@sa_event.listens_for(Session, "after_flush")
+def _note_changed_users(session, flush_context):
+    changed = {
+        obj.id for obj in session.dirty
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False)
+    }
+    changed.update(obj.id for obj in session.deleted if isinstance(obj, User))
+    if changed:
+        session.info.setdefault("changed_users", set()).update(changed)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _drop_changed_users(session):
+    # after the commit, so a concurrent request can't re-cache the old row in between
+    changed = session.info.pop("changed_users", None)
+    if changed and has_app_context():
+        cache = get_user_cache()
+        for user_id in changed:
+            cache.invalidate(user_id)
+
+
+@sa_event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_users(session, previous_transaction):
+    session.info.pop("changed_users", None)
@@ -1,59 +1,21 @@
-from datetime import date, datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for
-from sqlalchemy import or_
-from . import db
+from datetime import date
+from flask import Blueprint, current_app, jsonify, render_template, request, redirect, url_for
+from flask_login import current_user
+from markupsafe import Markup
+from .browse import Browse, browse_page, facet_counts, next_page_url
+from .cache import cached_fragment
+from .conditional import listing_validators, not_modified, with_validators
 from .models import Event
+from .pagination import page_size
+from .readonly import read_only
+from .search import search_events
 
 main_bp = Blueprint("main", __name__)
 
-# -------------------------------
-# Utility: Weekend date range
-# -------------------------------
-def _weekend_bounds(today: date) -> tuple[date, date]:
-    weekday = today.weekday()  # Monday=0, Sunday=6
-    saturday = today + timedelta(days=(5 - weekday)) if weekday <= 4 else today if weekday == 5 else today - timedelta(days=1)
-    sunday = saturday + timedelta(days=1)
-    return saturday, sunday
-
-
-# -------------------------------------
-# Event query helpers (with filters)
-# -------------------------------------
-def _fetch_events(filter_type: str) -> list[Event]:
-    today = date.today()
-
-    query = Event.query.filter(Event.date != None)  # noqa: E711
-
-    if filter_type == "today":
-        # Match events where the date equals today
-        query = query.filter(Event.date == today)
-
-    elif filter_type == "weekend":
-        # Only show events this coming Saturday/Sunday
-        saturday, sunday = _weekend_bounds(today)
-        query = query.filter(Event.date >= saturday, Event.date <= sunday)
-
-    elif filter_type == "past":
-        # Only show events before today
-        query = query.filter(Event.date < today)
-
-    else:
-        # Default: upcoming events (today or later)
-        query = query.filter(Event.date >= today)
-
-    events = query.order_by(Event.date.asc()).all()
-
-    # ✅ Only fallback if *no events exist at all*
-    if not events and filter_type == "all":
-        events = Event.query.order_by(Event.date.asc()).all()
-
-    return events
-
-
 # -----------------------------------------
 # Featured events (carousel)
 # -----------------------------------------
-def _fetch_featured_events() -> list[Event]:
+def _featured_events_query():
     today = date.today()
     return (
         Event.query.filter_by(featuredevent=True)
@@ -61,92 +23,147 @@ def _fetch_featured_events() -> list[Event]:
         .filter(Event.date >= today)
         .order_by(Event.date.asc())
         .limit(5)
-        .all()
     )
 
 
+def _fetch_featured_events() -> list[Event]:
+    return _featured_events_query().all()
+
+
+# -----------------------------------------
+# Cached fragments (see cache.py)
+# -----------------------------------------
+def _event_cards_fragment(f: Browse, cursor: str | None = None) -> Markup:
+    """Rendered card grid for one page of a filter combination, cached per filters/day/page."""
+    key = ":".join([
+        "cards", f.key(), date.today().isoformat(), cursor or "", str(page_size()),
+        "user" if current_user.is_authenticated else "anon",
+    ])
+
+    def render():
+        page, page_filters = browse_page(f, cursor)
+        return render_template(
+            "_event_cards.html",
+            events=page.items,
+            next_url=next_page_url("main.filter_events", page, page_filters),
+        )
+
+    return cached_fragment(key, render)
+
+
+def _featured_carousel_fragment() -> Markup:
+    """Rendered featured carousel (empty when nothing is featured), cached per day."""
+    def render():
+        featured_events = _fetch_featured_events()
+        if not featured_events:
+            return ""
+        return render_template("partials/featured_carousel.html", featured_events=featured_events)
+
+    return cached_fragment(f"featured:{date.today().isoformat()}", render)
+
+
 # -----------------------------
 # Home Page
 # -----------------------------
 @main_bp.route("/")
+@read_only
 def index():
-    """Main homepage with event list and featured carousel."""
-    filter_type = request.args.get("filter", "all")
-
-    # Fetch events
-    events = _fetch_events(filter_type)
-
-    # Fetch featured events
-    featured_events = _fetch_featured_events()
-
-    print(f"[DEBUG] {len(events)} events found for '{filter_type}'")
-    print(f"[DEBUG] {len(featured_events)} featured events found")
+    """Main homepage with event list, facet counts and featured carousel."""
+    f = Browse.from_args(request.args)
 
     return render_template(
         "index.html",
-        events=events,
-        featured_events=featured_events,
-        active_filter=filter_type,
+        cards_html=_event_cards_fragment(f),
+        carousel_html=_featured_carousel_fragment(),
+        active_filter=request.args.get("filter", "all"),
+        facets=facet_counts(f),
     )
 
 
 # -----------------------------
-# AJAX Date Filtering Only
+# AJAX Filtering
 # -----------------------------
 @main_bp.route("/events/filter")
+@read_only
 def filter_events():
-    """AJAX endpoint for filtering events by date only."""
-    filter_type = request.args.get("filter", "all")
-    today = date.today()
+    """AJAX endpoint: card HTML for any browse filters, one page per call (?cursor= for the next)."""
+    f = Browse.from_args(request.args)
+    cursor = request.args.get("cursor")
 
-    query = Event.query.filter(Event.date != None)
+    etag, last_modified = listing_validators("filter", f.key(), cursor, page_size())
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
 
-    if filter_type == "today":
-        query = query.filter(Event.date == today)
-    elif filter_type == "weekend":
-        saturday, sunday = _weekend_bounds(today)
-        query = query.filter(Event.date >= saturday, Event.date <= sunday)
-    elif filter_type == "past":
-        query = query.filter(Event.date < today)
-    else:
-        query = query.filter(Event.date >= today)
+    return with_validators(_event_cards_fragment(f, cursor), etag, last_modified)
 
-    events = query.order_by(Event.date.asc()).all()
 
-    if not events and filter_type == "all":
-        events = Event.query.order_by(Event.date.asc()).all()
+# -----------------------------
+# Browse API (JSON)
+# -----------------------------
+def _event_json(ev: Event) -> dict:
+    return {
+        "id": ev.id,
+        "title": ev.title,
+        "genre": ev.genre,
+        "venue": ev.venue,
+        "date": ev.date.isoformat(),
+        "start_time": ev.start_time.strftime("%H:%M") if ev.start_time else None,
+        "price": ev.price,
+        "tickets_left": ev.quantity,
+        "status": ev.status,
+        "url": url_for("event.show", id=ev.id),
+        "image": ev.image_url("card"),
+    }
+
+
+@main_bp.route("/events/browse")
+@read_only
+def browse():
+    """Events for ?filter= (or ?from=/?to=), ?genre=, ?min_price=/?max_price= and ?status=, with facet counts.
+
+    One page per call, as /events/filter; follow next_cursor for more.
+    """
+    f = Browse.from_args(request.args)
+    cursor = request.args.get("cursor")
+
+    etag, last_modified = listing_validators("browse", f.key(), cursor, page_size())
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+
+    page, page_filters = browse_page(f, cursor)
+    return with_validators(jsonify(
+        filters=page_filters.args(),
+        events=[_event_json(ev) for ev in page.items],
+        next_cursor=page.next_cursor,
+        facets=facet_counts(f),
+    ), etag, last_modified)
 
-    print(f"[DEBUG] {len(events)} events after filtering by date '{filter_type}'")
-    return render_template("_event_cards.html", events=events)
 
 # -----------------------------
 # Search Route
 # -----------------------------
 @main_bp.route("/search")
+@read_only
 def search():
-    """Search events by title or description."""
+    """Search events by title, description, venue and genre."""
     query_text = request.args.get("search", "").strip()
     if not query_text:
         return redirect(url_for("main.index"))
 
-    like_pattern = f"%{query_text}%"
-    events = db.session.scalars(
-        db.select(Event).where(
-            or_(
-                Event.title.ilike(like_pattern),
-                Event.description.ilike(like_pattern)
-            )
-        )
-    ).all()
-
-    featured_events = _fetch_featured_events()
-
-    print(f"[DEBUG] Search returned {len(events)} results for query '{query_text}'")
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = current_app.config["SEARCH_PAGE_SIZE"]
+    events, total = search_events(query_text, page=page, per_page=per_page)
 
     return render_template(
         "index.html",
-        events=events,
-        featured_events=featured_events,
+        cards_html=Markup(render_template("_event_cards.html", events=events)),
+        carousel_html=_featured_carousel_fragment(),
         active_filter="search",
+        facets=facet_counts(Browse()),
         search_query=query_text,
+        page=page,
+        has_prev=page > 1,
+        has_next=page * per_page < total,
     )